@@ -0,0 +1,322 @@
+"""
+Bounding volume hierarchy over the bounded scene surfaces
+
+The tree is built top-down with the binned surface area heuristic (SAH)
+as a binary tree, then collapsed into a 4-wide tree and flattened into
+structure-of-arrays node buffers, so the Numba traversal in
+nearest_hit_bvh works on plain arrays and an explicit stack. Each wide
+node keeps the boxes of its (up to) four children side by side, so one
+node visit tests all four with the same slab code and pushes only the
+children the ray enters, nearest last. Infinite planes have no finite
+bounds and stay outside the tree.
+"""
+
+import numpy as np
+from jit import njit, FASTMATH
+from intersect_numba import sphere_hit, plane_hit, cube_hit, _slab, INF
+
+# SAH cost of visiting a node, relative to one primitive test
+TRAVERSAL_COST = 0.125
+
+# Children per node of the collapsed tree
+BRANCHING = 4
+
+
+def _surface_area(low, high):
+    """Surface area of the box [low, high]; 0 for an empty box"""
+    extent = np.maximum(high - low, 0)
+    return 2 * (extent[0] * extent[1] + extent[1] * extent[2] + extent[2] * extent[0])
+
+
+class BVH:
+    """
+    4-wide BVH with flattened node arrays
+
+    Lane k of node i is a child with the box [node_min[i, :, k], node_max[i, :, k]]
+    (the lanes of each axis are contiguous). By node_prim_count[i, k], the
+    child is a leaf holding the primitives
+    prim_indices[node_child[i, k]:][:node_prim_count[i, k]] if the count is
+    positive, the inner node node_child[i, k] if it is 0, and missing if it
+    is -1 (unused lanes come last). Node 0 is the root. An empty BVH has no
+    nodes.
+    """
+
+    def __init__(self, mins, maxs, max_leaf_size=2, bin_count=16):
+        """
+        Build the tree over a set of boxes
+
+        Args:
+            mins: numpy array (N, 3) - Minimum corner of each primitive's box
+            maxs: numpy array (N, 3) - Maximum corner of each primitive's box
+            max_leaf_size: int - Leaves hold at most this many primitives,
+                           unless the SAH finds no useful split
+            bin_count: int - Number of SAH bins per axis
+        """
+        self.mins = np.asarray(mins, dtype=float).reshape(-1, 3)
+        self.maxs = np.asarray(maxs, dtype=float).reshape(-1, 3)
+        self.centroids = (self.mins + self.maxs) / 2
+        self.max_leaf_size = max_leaf_size
+        self.bin_count = bin_count
+
+        self.prim_indices = np.arange(len(self.mins), dtype=np.int32)
+        # Binary nodes [min, max, left, right, first prim, prim count], while building
+        self._nodes = []
+        self._wide_nodes = []
+        self.depth = 0
+        if len(self.mins):
+            self._build(0, len(self.mins))
+            self._collapse(0, 1)
+
+        node_count = len(self._wide_nodes)
+        self.node_min = np.zeros((node_count, 3, BRANCHING))
+        self.node_max = np.zeros((node_count, 3, BRANCHING))
+        self.node_child = np.zeros((node_count, BRANCHING), dtype=np.int32)
+        self.node_prim_count = np.full((node_count, BRANCHING), -1, dtype=np.int32)
+        for i, lanes in enumerate(self._wide_nodes):
+            for k, (low, high, child, count) in enumerate(lanes):
+                self.node_min[i, :, k] = low
+                self.node_max[i, :, k] = high
+                self.node_child[i, k] = child
+                self.node_prim_count[i, k] = count
+        del self._nodes, self._wide_nodes
+
+    @property
+    def arrays(self):
+        """Node arrays and traversal stack size, in the argument order of nearest_hit_bvh"""
+        # A visit pops one node and pushes at most BRANCHING children
+        stack_size = (BRANCHING - 1) * self.depth + 1
+        return (
+            self.node_min, self.node_max, self.node_child, self.node_prim_count,
+            self.prim_indices, stack_size,
+        )
+
+    def __len__(self):
+        """Number of (wide) nodes"""
+        return len(self.node_prim_count)
+
+    def _build(self, first, count):
+        """Build the binary subtree over prim_indices[first:first + count]; returns its node id"""
+        prims = self.prim_indices[first:first + count]
+        node = len(self._nodes)
+        self._nodes.append([self.mins[prims].min(axis=0), self.maxs[prims].max(axis=0), -1, -1, first, count])
+
+        if count <= self.max_leaf_size:
+            return node
+        split = self._find_split(prims)
+        if split is None:
+            return node
+
+        axis, position = split
+        left = self.centroids[prims, axis] < position
+        left_count = int(left.sum())
+        if left_count == 0 or left_count == count:
+            return node
+
+        self.prim_indices[first:first + count] = np.concatenate([prims[left], prims[~left]])
+        left_child = self._build(first, left_count)
+        right_child = self._build(first + left_count, count - left_count)
+        self._nodes[node][2:] = [left_child, right_child, 0, 0]
+        return node
+
+    def _collapse(self, node, depth):
+        """
+        Wide node for the binary subtree under a node; returns its id
+
+        The children of the binary node are opened up, largest surface area
+        first, until there are BRANCHING of them or all are leaves.
+        """
+        self.depth = max(self.depth, depth)
+        nodes = self._nodes
+        if nodes[node][5] > 0:
+            lanes = [node]  # The whole tree is one leaf
+        else:
+            lanes = [nodes[node][2], nodes[node][3]]
+            while len(lanes) < BRANCHING:
+                inner = [child for child in lanes if nodes[child][5] == 0]
+                if not inner:
+                    break
+                child = max(inner, key=lambda n: _surface_area(nodes[n][0], nodes[n][1]))
+                lanes.remove(child)
+                lanes += nodes[child][2:4]
+
+        wide_node = len(self._wide_nodes)
+        self._wide_nodes.append(None)
+        self._wide_nodes[wide_node] = [
+            (nodes[child][0], nodes[child][1], nodes[child][4], nodes[child][5]) if nodes[child][5] > 0
+            else (nodes[child][0], nodes[child][1], self._collapse(child, depth + 1), 0)
+            for child in lanes
+        ]
+        return wide_node
+
+    def _find_split(self, prims):
+        """
+        Best binned SAH split of a set of primitives
+
+        Returns:
+            Tuple (axis, position) - Primitives with centroid < position go left,
+            or None if no split is cheaper than keeping a single leaf
+        """
+        centroids = self.centroids[prims]
+        low, high = centroids.min(axis=0), centroids.max(axis=0)
+        parent_area = _surface_area(self.mins[prims].min(axis=0), self.maxs[prims].max(axis=0))
+        if parent_area <= 0:
+            return None
+
+        best_cost = float(len(prims))  # Cost of leaving them all in one leaf
+        best_split = None
+        bins = self.bin_count
+        for axis in range(3):
+            extent = high[axis] - low[axis]
+            if extent <= 0:
+                continue
+            bin_ids = np.minimum(((centroids[:, axis] - low[axis]) / extent * bins).astype(int), bins - 1)
+
+            counts = np.bincount(bin_ids, minlength=bins)
+            bin_min = np.full((bins, 3), np.inf)
+            bin_max = np.full((bins, 3), -np.inf)
+            np.minimum.at(bin_min, bin_ids, self.mins[prims])
+            np.maximum.at(bin_max, bin_ids, self.maxs[prims])
+
+            # Area and count left and right of each of the bins - 1 split planes
+            left_min = np.minimum.accumulate(bin_min)[:-1]
+            left_max = np.maximum.accumulate(bin_max)[:-1]
+            right_min = np.minimum.accumulate(bin_min[::-1])[::-1][1:]
+            right_max = np.maximum.accumulate(bin_max[::-1])[::-1][1:]
+            left_counts = np.cumsum(counts)[:-1]
+            right_counts = len(prims) - left_counts
+
+            for i in range(bins - 1):
+                if left_counts[i] == 0 or right_counts[i] == 0:
+                    continue
+                cost = TRAVERSAL_COST + (
+                    _surface_area(left_min[i], left_max[i]) * left_counts[i]
+                    + _surface_area(right_min[i], right_max[i]) * right_counts[i]
+                ) / parent_area
+                if cost < best_cost:
+                    best_cost = cost
+                    best_split = (axis, low[axis] + extent * (i + 1) / bins)
+
+        return best_split
+
+
+@njit(fastmath=FASTMATH, cache=True)
+def _box_entry(ox, oy, oz, dx, dy, dz, inv_dx, inv_dy, inv_dz, node_min, node_max, node, lane):
+    """Distance at which the ray enters a child's box (0 if inside), inf if it misses"""
+    near_x, far_x = _slab(ox, dx, inv_dx, node_min[node, 0, lane], node_max[node, 0, lane])
+    near_y, far_y = _slab(oy, dy, inv_dy, node_min[node, 1, lane], node_max[node, 1, lane])
+    near_z, far_z = _slab(oz, dz, inv_dz, node_min[node, 2, lane], node_max[node, 2, lane])
+    t_near = max(near_x, near_y, near_z, 0.0)
+    t_far = min(far_x, far_y, far_z)
+    if t_near > t_far:
+        return INF
+    return t_near
+
+
+@njit(fastmath=FASTMATH, cache=True)
+def nearest_hit_bvh(ox, oy, oz, dx, dy, dz, sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                    plane_normals, plane_offsets, cube_mins, cube_maxs,
+                    node_min, node_max, node_child, node_prim_count,
+                    prim_indices, stack_size, ignore_column=-1, t_max=INF, any_hit=False):
+    """
+    nearest_hit (see intersect_numba) with the spheres and cubes in a BVH
+
+    Primitive p of the BVH is sphere p for p < number of spheres and cube
+    p - number of spheres otherwise. Planes are tested first, linearly,
+    which also tightens the bound the tree traversal prunes against.
+    stack_size must be at least the one in BVH.arrays.
+
+    Returns:
+        Tuple (t, column, nx, ny, nz); column is -1 and t is inf on a miss
+    """
+    best_t = t_max
+    best_column = -1
+    best_nx, best_ny, best_nz = 0.0, 0.0, 0.0
+    sphere_count = sphere_radii_sq.shape[0]
+    plane_count = plane_offsets.shape[0]
+
+    for i in range(plane_count):
+        column = sphere_count + i
+        if column != ignore_column:
+            t, nx, ny, nz = plane_hit(
+                ox, oy, oz, dx, dy, dz,
+                plane_normals[i, 0], plane_normals[i, 1], plane_normals[i, 2],
+                plane_offsets[i], best_t,
+            )
+            if t < best_t:
+                best_t, best_column = t, column
+                best_nx, best_ny, best_nz = nx, ny, nz
+                if any_hit:
+                    return best_t, best_column, best_nx, best_ny, best_nz
+
+    if node_prim_count.shape[0] > 0:
+        inv_dx = 1.0 / dx if dx != 0 else INF
+        inv_dy = 1.0 / dy if dy != 0 else INF
+        inv_dz = 1.0 / dz if dz != 0 else INF
+
+        # Pending children with the distance at which the ray enters them:
+        # inner nodes by id, leaves as ~(BRANCHING * node + lane)
+        stack = np.empty(stack_size, dtype=np.int32)
+        stack_t = np.empty(stack_size)
+        stack[0] = 0
+        stack_t[0] = 0.0
+        top = 1
+
+        while top > 0:
+            top -= 1
+            if stack_t[top] >= best_t:
+                continue  # A closer hit was found since this child was pushed
+            entry = stack[top]
+
+            if entry < 0:
+                node, k = divmod(~entry, BRANCHING)
+                first = node_child[node, k]
+                for m in range(first, first + node_prim_count[node, k]):
+                    p = prim_indices[m]
+                    if p < sphere_count:
+                        column = p
+                        if column == ignore_column:
+                            continue
+                        t, nx, ny, nz = sphere_hit(
+                            ox, oy, oz, dx, dy, dz,
+                            sphere_centers[p, 0], sphere_centers[p, 1], sphere_centers[p, 2],
+                            sphere_radii_sq[p], sphere_inv_radii[p], best_t,
+                        )
+                    else:
+                        c = p - sphere_count
+                        column = p + plane_count
+                        if column == ignore_column:
+                            continue
+                        t, nx, ny, nz = cube_hit(
+                            ox, oy, oz, dx, dy, dz, inv_dx, inv_dy, inv_dz,
+                            cube_mins[c, 0], cube_mins[c, 1], cube_mins[c, 2],
+                            cube_maxs[c, 0], cube_maxs[c, 1], cube_maxs[c, 2], best_t,
+                        )
+                    if t < best_t:
+                        best_t, best_column = t, column
+                        best_nx, best_ny, best_nz = nx, ny, nz
+                        if any_hit:
+                            return best_t, best_column, best_nx, best_ny, best_nz
+                continue
+
+            # Push the children the ray enters, sorted so that the nearest
+            # ends up on top and is visited next
+            bottom = top
+            for k in range(BRANCHING):
+                count = node_prim_count[entry, k]
+                if count < 0:
+                    break
+                t = _box_entry(ox, oy, oz, dx, dy, dz, inv_dx, inv_dy, inv_dz, node_min, node_max, entry, k)
+                if t >= best_t:
+                    continue
+                j = top
+                while j > bottom and stack_t[j - 1] < t:
+                    stack[j] = stack[j - 1]
+                    stack_t[j] = stack_t[j - 1]
+                    j -= 1
+                stack[j] = node_child[entry, k] if count == 0 else ~(BRANCHING * entry + k)
+                stack_t[j] = t
+                top += 1
+
+    if best_column < 0:
+        best_t = INF
+    return best_t, best_column, best_nx, best_ny, best_nz
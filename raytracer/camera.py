@@ -1,6 +1,6 @@
 import numpy as np
 from ray import Ray
-from mathutils import cross, normalize
+from mathutils import cross, normalize, REAL
 
 
 class Camera:
@@ -48,10 +48,14 @@ class Camera:
         - up: perpendicular to forward and right (corrected up direction)
         
         This forms a right-handed coordinate system.
+
+        Also caches basis, the (3, 3) matrix with columns right, up and
+        forward, which maps camera-space vectors to world space.
         """
         self.forward = normalize(self.look_at - self.position)
         self.right = normalize(cross(self.forward, self.up_vector))
         self.up = normalize(cross(self.right, self.forward))
+        self.basis = np.ascontiguousarray(np.stack([self.right, self.up, self.forward]).T, dtype=REAL)
     
     def generate_ray(self, pixel_x, pixel_y, image_width, image_height):
         """
@@ -75,8 +79,45 @@ class Camera:
         screen_y = 0.5 - (pixel_y + 0.5) / image_height  # Flip Y as image coordinates start at top-left
         screen_x *= self.screen_width
         screen_y *= screen_height
-        screen_center = self.position + self.forward * self.screen_distance
-        screen_point = screen_center - self.right * screen_x + self.up * screen_y
-        ray_direction = screen_point - self.position
+        # Screen point relative to the camera, in camera space (the x axis is
+        # mirrored: the screen point is at -right * screen_x)
+        ray_direction = self.basis @ np.array([-screen_x, screen_y, self.screen_distance], dtype=REAL)
 
         return Ray(self.position, ray_direction)
+
+    def generate_rays_grid(self, image_width, image_height, normalized=False):
+        """
+        Generate the rays through every pixel of the image at once
+
+        Vectorized equivalent of calling generate_ray for each pixel. Pixels
+        are ordered row by row, so ray index = pixel_y * image_width + pixel_x.
+
+        Args:
+            image_width: int - Total width of image in pixels
+            image_height: int - Total height of image in pixels
+            normalized: bool - Scale the directions to unit length (in place)
+
+        Returns:
+            Tuple (origins, directions) of REAL (float32) arrays with shape (H*W, 3).
+            origins is a read-only broadcast view of the camera position;
+            directions are unit vectors only if normalized is set.
+        """
+        aspect_ratio = image_width / image_height
+        screen_height = self.screen_width / aspect_ratio
+        px = np.arange(image_width, dtype=REAL)
+        py = np.arange(image_height, dtype=REAL)
+        sx = ((px + 0.5) / image_width - 0.5) * REAL(self.screen_width)
+        sy = (0.5 - (py + 0.5) / image_height) * REAL(screen_height)  # Flip Y as image coordinates start at top-left
+        SX, SY = np.meshgrid(sx, sy)
+
+        # Camera-space screen points, mapped to world space with one matrix product
+        local = np.empty((image_height * image_width, 3), dtype=REAL)
+        local[:, 0] = -SX.ravel()
+        local[:, 1] = SY.ravel()
+        local[:, 2] = self.screen_distance
+        directions = local @ self.basis.T
+        if normalized:
+            directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        origins = np.broadcast_to(self.position.astype(REAL), directions.shape)
+
+        return origins, directions
@@ -0,0 +1,52 @@
+"""
+Optional CuPy support
+
+CuPy is not a hard requirement. The batched kernels in scene.py are written
+against an array module (numpy or cupy) picked from their inputs, so the
+same broadcasting code runs on the GPU when the scene arrays live there and
+on the CPU otherwise.
+"""
+
+import numpy as np
+
+try:
+    import cupy
+    CUPY_AVAILABLE = True
+except ImportError:
+    cupy = None
+    CUPY_AVAILABLE = False
+
+DEVICES = ('cpu', 'cuda')
+
+
+def device_module(device):
+    """
+    Array module for a device name
+
+    Args:
+        device: str - 'cpu' or 'cuda'
+
+    Returns:
+        numpy for 'cpu', cupy for 'cuda'
+    """
+    if device == 'cuda':
+        if not CUPY_AVAILABLE:
+            raise RuntimeError("device 'cuda' requires CuPy to be installed")
+        return cupy
+    if device != 'cpu':
+        raise ValueError(f"Unknown device: {device}")
+    return np
+
+
+def array_module(*arrays):
+    """Array module (numpy or cupy) that owns the given arrays"""
+    if CUPY_AVAILABLE:
+        return cupy.get_array_module(*arrays)
+    return np
+
+
+def to_numpy(array):
+    """Copy an array back to the host if it lives on the GPU"""
+    if CUPY_AVAILABLE:
+        return cupy.asnumpy(array)
+    return np.asarray(array)
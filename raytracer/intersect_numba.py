@@ -0,0 +1,204 @@
+"""
+Scalar ray-surface intersection kernels
+
+The kernels take plain floats instead of Ray objects and return plain
+tuples instead of Intersection objects, so Numba can compile them to
+native code (see jit.py). Each returns (t, nx, ny, nz) where t is the hit
+distance and (nx, ny, nz) the surface normal; t == inf means a miss.
+Hits at or beyond t_max are reported as misses, so callers that already
+have a closer hit can skip the rest of the work.
+"""
+
+import math
+from jit import njit, FASTMATH
+
+# Minimum hit distance, to avoid self-intersection
+EPSILON = 0.0001
+INF = math.inf
+
+
+@njit(fastmath=FASTMATH, cache=True)
+def sphere_hit(ox, oy, oz, dx, dy, dz, cx, cy, cz, radius_sq, inv_radius, t_max=INF):
+    """
+    Intersect a ray with a sphere (center, radius squared, 1 / radius)
+
+    The direction must be normalized, which turns the quadratic into the
+    half-b form: no divide by 2a, and the normal needs no divide either.
+    Both radius terms are precomputed per sphere, at scene load.
+    """
+    ocx = ox - cx
+    ocy = oy - cy
+    ocz = oz - cz
+
+    half_b = ocx * dx + ocy * dy + ocz * dz
+    c = ocx * ocx + ocy * ocy + ocz * ocz - radius_sq
+    if c > 0 and half_b > 0:
+        return INF, 0.0, 0.0, 0.0  # Origin outside, ray pointing away
+
+    discriminant = half_b * half_b - c
+    if discriminant < 0:
+        return INF, 0.0, 0.0, 0.0
+
+    sqrt_discriminant = math.sqrt(discriminant)
+    t = -half_b - sqrt_discriminant
+    if t <= EPSILON:
+        t = -half_b + sqrt_discriminant
+        if t <= EPSILON:
+            return INF, 0.0, 0.0, 0.0
+    if t >= t_max:
+        return INF, 0.0, 0.0, 0.0
+
+    return (
+        t,
+        (ocx + t * dx) * inv_radius,
+        (ocy + t * dy) * inv_radius,
+        (ocz + t * dz) * inv_radius,
+    )
+
+
+@njit(fastmath=FASTMATH, cache=True)
+def plane_hit(ox, oy, oz, dx, dy, dz, nx, ny, nz, offset, t_max=INF):
+    """Intersect a ray with an infinite plane (normalized normal, offset)"""
+    denom = dx * nx + dy * ny + dz * nz
+    if abs(denom) < 1e-6:
+        return INF, 0.0, 0.0, 0.0  # Ray is parallel to the plane
+
+    # Same reciprocal-multiply as the cube slabs, so a plane and a coplanar
+    # cube face produce bit-identical distances and ties resolve consistently
+    t = (offset - (ox * nx + oy * ny + oz * nz)) * (1.0 / denom)
+    if t < EPSILON or t >= t_max:
+        return INF, 0.0, 0.0, 0.0  # Behind the ray origin or beyond t_max
+
+    return t, nx, ny, nz
+
+
+@njit(fastmath=FASTMATH, cache=True)
+def _slab(origin, direction, inv_direction, low, high):
+    """Entry and exit distances through one axis slab; (inf, -inf) if missed"""
+    if abs(direction) < 1e-6:
+        # Ray is parallel to slab
+        if origin < low or origin > high:
+            return INF, -INF
+        return -INF, INF
+
+    # min/max rather than a compare-and-swap: compiles to branchless minsd/maxsd
+    t1 = (low - origin) * inv_direction
+    t2 = (high - origin) * inv_direction
+    return min(t1, t2), max(t1, t2)
+
+
+@njit(fastmath=FASTMATH, cache=True)
+def cube_hit(ox, oy, oz, dx, dy, dz, inv_dx, inv_dy, inv_dz,
+             min_x, min_y, min_z, max_x, max_y, max_z, t_max=INF):
+    """
+    Intersect a ray with an axis-aligned cube (min corner, max corner)
+
+    Takes the inverse direction (1 / d per axis) as well, so the slab
+    distances cost multiplies instead of divides; a ray tested against many
+    cubes computes it only once.
+    """
+    near_x, far_x = _slab(ox, dx, inv_dx, min_x, max_x)
+    near_y, far_y = _slab(oy, dy, inv_dy, min_y, max_y)
+    if near_x > far_y or near_y > far_x:
+        return INF, 0.0, 0.0, 0.0  # x and y slabs do not overlap
+    near_z, far_z = _slab(oz, dz, inv_dz, min_z, max_z)
+
+    t_far = min(far_x, far_y, far_z)
+
+    # The entry axis is the one whose slab the ray enters last
+    axis = 0
+    t_min = near_x
+    direction = dx
+    if near_y > t_min:
+        axis = 1
+        t_min = near_y
+        direction = dy
+    if near_z > t_min:
+        axis = 2
+        t_min = near_z
+        direction = dz
+
+    if t_min > t_far or t_far < EPSILON:
+        return INF, 0.0, 0.0, 0.0
+    if t_min < EPSILON:
+        t_min = t_far  # Use the exit distance if the entry is behind
+    if t_min >= t_max:
+        return INF, 0.0, 0.0, 0.0
+
+    sign = -1.0 if direction > 0 else 1.0
+    if axis == 0:
+        return t_min, sign, 0.0, 0.0
+    if axis == 1:
+        return t_min, 0.0, sign, 0.0
+    return t_min, 0.0, 0.0, sign
+
+
+@njit(fastmath=FASTMATH, cache=True)
+def nearest_hit(ox, oy, oz, dx, dy, dz, sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                plane_normals, plane_offsets, cube_mins, cube_maxs,
+                ignore_column=-1, t_max=INF, any_hit=False):
+    """
+    Nearest hit of one ray against the structure-of-arrays scene
+
+    Surfaces are numbered spheres first, then planes, then cubes (the
+    column order of SceneSOA). ignore_column skips one surface. Only hits
+    closer than t_max count; with any_hit set, the first such hit is
+    returned instead of the nearest one (enough for shadow rays).
+
+    Returns:
+        Tuple (t, column, nx, ny, nz); column is -1 and t is inf on a miss
+    """
+    best_t = t_max
+    best_column = -1
+    best_nx, best_ny, best_nz = 0.0, 0.0, 0.0
+    column = 0
+
+    for i in range(sphere_radii_sq.shape[0]):
+        if column != ignore_column:
+            t, nx, ny, nz = sphere_hit(
+                ox, oy, oz, dx, dy, dz,
+                sphere_centers[i, 0], sphere_centers[i, 1], sphere_centers[i, 2],
+                sphere_radii_sq[i], sphere_inv_radii[i], best_t,
+            )
+            if t < best_t:
+                best_t, best_column = t, column
+                best_nx, best_ny, best_nz = nx, ny, nz
+                if any_hit:
+                    return best_t, best_column, best_nx, best_ny, best_nz
+        column += 1
+
+    for i in range(plane_offsets.shape[0]):
+        if column != ignore_column:
+            t, nx, ny, nz = plane_hit(
+                ox, oy, oz, dx, dy, dz,
+                plane_normals[i, 0], plane_normals[i, 1], plane_normals[i, 2],
+                plane_offsets[i], best_t,
+            )
+            if t < best_t:
+                best_t, best_column = t, column
+                best_nx, best_ny, best_nz = nx, ny, nz
+                if any_hit:
+                    return best_t, best_column, best_nx, best_ny, best_nz
+        column += 1
+
+    # Parallel axes never reach the inverse (see _slab), so any value will do
+    inv_dx = 1.0 / dx if dx != 0 else INF
+    inv_dy = 1.0 / dy if dy != 0 else INF
+    inv_dz = 1.0 / dz if dz != 0 else INF
+    for i in range(cube_mins.shape[0]):
+        if column != ignore_column:
+            t, nx, ny, nz = cube_hit(
+                ox, oy, oz, dx, dy, dz, inv_dx, inv_dy, inv_dz,
+                cube_mins[i, 0], cube_mins[i, 1], cube_mins[i, 2],
+                cube_maxs[i, 0], cube_maxs[i, 1], cube_maxs[i, 2], best_t,
+            )
+            if t < best_t:
+                best_t, best_column = t, column
+                best_nx, best_ny, best_nz = nx, ny, nz
+                if any_hit:
+                    return best_t, best_column, best_nx, best_ny, best_nz
+        column += 1
+
+    if best_column < 0:
+        best_t = INF
+    return best_t, best_column, best_nx, best_ny, best_nz
@@ -1,19 +1,67 @@
 from dataclasses import dataclass
+from typing import NamedTuple
 import numpy as np
+from mathutils import REAL
 
 
-@dataclass
+# Fixed-size record for storing the hits of a whole batch of rays in one
+# preallocated array; surf_id indexes the scene surfaces, -1 means a miss
+HIT_DTYPE = np.dtype([
+    ('t', REAL),
+    ('px', REAL), ('py', REAL), ('pz', REAL),
+    ('nx', REAL), ('ny', REAL), ('nz', REAL),
+    ('surf_id', 'i4'),
+])
+
+
+@dataclass(slots=True)
 class Intersection:
     """
     Represents a ray-surface intersection point
     
     Attributes:
         hit_point: numpy array [x, y, z] - Point where ray hits surface
-        normal: numpy array [x, y, z] - Surface normal at hit point (normalized)
+        normal: numpy array [x, y, z] - Surface normal at hit point (normalized);
+                may be shared between hits (planes, cube faces), so read-only
         distance: float - Distance from ray origin to hit point
         surface: Surface object that was hit (optional, added by find_nearest_intersection)
+        surface_id: int - Index of the surface in scene.surfaces, -1 if not known
     """
     hit_point: np.ndarray
     normal: np.ndarray
     distance: float
     surface: object = None
+    surface_id: int = -1
+
+    @classmethod
+    def from_record(cls, record, surfaces):
+        """
+        Build an Intersection from one HIT_DTYPE record
+
+        Args:
+            record: numpy record of dtype HIT_DTYPE (must be a hit, surf_id >= 0)
+            surfaces: List of scene surfaces that surf_id indexes into
+
+        Returns:
+            Intersection object for the hit
+        """
+        return cls(
+            hit_point=np.array([record['px'], record['py'], record['pz']], dtype=float),
+            normal=np.array([record['nx'], record['ny'], record['nz']], dtype=float),
+            distance=float(record['t']),
+            surface=surfaces[record['surf_id']],
+            surface_id=int(record['surf_id']),
+        )
+
+
+class IntersectionBatch(NamedTuple):
+    """
+    Nearest hits of a batch of rays, as parallel arrays
+
+    Attributes:
+        distances: numpy array (R,) - Distance to the nearest hit (np.inf on miss)
+        surface_indices: numpy int array (R,) - Index into scene.surfaces
+                         of the nearest hit surface, -1 on miss
+    """
+    distances: np.ndarray
+    surface_indices: np.ndarray
@@ -1,67 +1,78 @@
 import numpy as np
+from intersection import Intersection, IntersectionBatch
+from scene import SceneSOA
+from intersect_numba import nearest_hit
+from bvh import nearest_hit_bvh
+from device import array_module
+from jit import NUMBA_AVAILABLE
 from ray import Ray
-from intersection import Intersection
-from surfaces.sphere import Sphere
-from surfaces.infinite_plane import InfinitePlane
-from surfaces.cube import Cube
+from render_numba import nearest_hit_rays, any_hit_rays
+from surfaces import SURFACE_KIND_PLANE, SURFACE_KIND_CUBE
+from surfaces.cube import FACE_NORMALS
 
+# Without Numba, testing one ray against the SoA arrays with numpy only beats
+# the per-surface loop (scalar Python math) once the scene is this large
+BATCH_MIN_SURFACES = 128
 
-def intersect_sphere(ray, sphere):
-    return sphere.intersect(ray)
+__all__ = [
+    'find_all_intersections',
+    'find_nearest_intersection',
+    'find_any_intersection',
+    'find_nearest_intersection_batch',
+    'find_nearest_hits',
+    'find_any_intersection_batch',
+]
 
 
-def intersect_plane(ray, plane):
-    return plane.intersect(ray)
-
+def find_all_intersections(origins, directions, surfaces, ignore_surface=None):
+    """
+    Find all surface intersections of a batch of rays, sorted by distance
 
-def intersect_cube(ray, cube):
-    return cube.intersect(ray)
+    One broadcast distance matrix and one argsort per batch: no Intersection
+    object or list is built per hit, callers look surfaces up by index.
 
-def find_all_intersections(ray, surfaces, ignore_surface=None):
-    """
-    Find all surface intersections along a ray
-    
     Args:
-        ray: Ray object with origin and direction
-        surfaces: List of all surface objects in the scene (Sphere, Plane, Cube)
+        origins: numpy array (R, 3) - Ray origins, or (3,) for one origin shared by all rays
+        directions: numpy array (R, 3) - Ray directions (normalized)
+        surfaces: List of all surface objects in the scene, or a SceneSOA
         ignore_surface: Optional surface object to ignore (used for reflections
                        to avoid self-intersection)
-        
+
     Returns:
-        List of Intersection objects, each with:
-            surface: The surface object that was hit
-            hit_point: numpy array [x, y, z] - intersection point
-            normal: numpy array [x, y, z] - surface normal (normalized)
-            distance: float - distance from ray origin to hit point
-        Returns empty list if no intersections found
+        Tuple (distances, surface_indices, counts):
+            distances: numpy array (R, N) - Hit distances of each ray in
+                       increasing order, padded with np.inf
+            surface_indices: numpy int array (R, N) - Index into the surfaces
+                             of each hit, padded with -1
+            counts: numpy int array (R,) - Number of hits of each ray, so row i
+                    holds its hits in [:counts[i]]
     """
-    intersections = []
-    
-    for surface in surfaces:
-        # Skip if this is the surface to ignore (avoid self-intersection)
-        if surface is ignore_surface:
-            continue
-        
-        # Call the surface's intersect method
-        intersection = surface.intersect(ray)
-        
-        # If intersection found, add surface reference and append to list
-        if intersection is not None:
-            intersection.surface = surface
-            intersections.append(intersection)
-    
-    return intersections
+    scene = surfaces if isinstance(surfaces, SceneSOA) else SceneSOA(surfaces)
+    xp = array_module(origins, scene.sphere_centers)
+    distances = scene.intersect_batch(origins, directions)
+    ignore_column = -1 if ignore_surface is None else scene.column_of(ignore_surface)
+    if ignore_column >= 0:
+        distances[:, ignore_column] = xp.inf
 
+    order = xp.argsort(distances, axis=1)
+    distances = xp.take_along_axis(distances, order, axis=1)
+    hit = xp.isfinite(distances)
+    surface_indices = xp.where(hit, scene.surface_ids[order], -1)
+    return distances, surface_indices, hit.sum(axis=1)
 
-def find_nearest_intersection(ray, surfaces, ignore_surface=None):
+
+def find_nearest_intersection(ray, surfaces, ignore_surface=None, t_max=np.inf):
     """
     Find the nearest surface intersection along a ray
         
     Args:
         ray: Ray object with origin and direction
-        surfaces: List of all surface objects in the scene (Sphere, Plane, Cube)
+        surfaces: List of all surface objects in the scene (Sphere, Plane, Cube),
+                  or a SceneSOA to use the compiled nearest_hit kernel (or,
+                  without Numba, the numpy SoA kernels for large scenes)
         ignore_surface: Optional surface object to ignore (used for reflections
                        to avoid self-intersection)
+        t_max: float - Only look for intersections closer than this distance
         
     Returns:
         Intersection object with:
@@ -71,16 +82,24 @@ def find_nearest_intersection(ray, surfaces, ignore_surface=None):
             distance: float - distance from ray origin to hit point
         Returns None if no intersection found
     """
+    if isinstance(surfaces, SceneSOA):
+        if NUMBA_AVAILABLE:
+            return _find_nearest_intersection_soa(ray, surfaces, ignore_surface, t_max)
+        if len(surfaces.surfaces) >= BATCH_MIN_SURFACES:
+            return _find_nearest_intersection_vectorized(ray, surfaces, ignore_surface, t_max)
+        surfaces = surfaces.surfaces
+
     nearest_intersection = None
-    nearest_distance = np.inf
+    nearest_distance = t_max
     
-    for surface in surfaces:
+    for surface_id, surface in enumerate(surfaces):
         # Skip if this is the surface to ignore (avoid self-intersection)
         if surface is ignore_surface:
             continue
         
-        # Call the surface's intersect method
-        intersection = surface.intersect(ray)
+        # Only hits closer than the nearest one so far can replace it, so pass
+        # that distance down and let the surface reject farther hits early
+        intersection = surface.intersect(ray, nearest_distance)
         
         # Check if this is the closest intersection so far
         if intersection is not None and intersection.distance < nearest_distance:
@@ -88,5 +107,238 @@ def find_nearest_intersection(ray, surfaces, ignore_surface=None):
             nearest_intersection = intersection
             # Add reference to the surface that was hit
             nearest_intersection.surface = surface
+            nearest_intersection.surface_id = surface_id
     
-    return nearest_intersection
\ No newline at end of file
+    return nearest_intersection
+
+
+def find_any_intersection(ray, surfaces, t_max=np.inf, ignore_surface=None):
+    """
+    Find any surface intersection closer than t_max along a ray
+
+    Stops at the first hit found instead of searching for the nearest one,
+    which is all a shadow ray needs to know whether the light is blocked.
+
+    Args:
+        ray: Ray object with origin and direction
+        surfaces: List of all surface objects in the scene, or a SceneSOA
+        t_max: float - Only look for intersections closer than this distance
+        ignore_surface: Optional surface object to ignore
+
+    Returns:
+        Intersection object (not necessarily the nearest one), or None if
+        nothing is hit closer than t_max
+    """
+    if isinstance(surfaces, SceneSOA):
+        if NUMBA_AVAILABLE:
+            return _find_nearest_intersection_soa(ray, surfaces, ignore_surface, t_max, any_hit=True)
+        surfaces = surfaces.surfaces
+
+    for surface_id, surface in enumerate(surfaces):
+        if surface is ignore_surface:
+            continue
+
+        intersection = surface.intersect(ray, t_max)
+        if intersection is not None:
+            intersection.surface = surface
+            intersection.surface_id = surface_id
+            return intersection
+
+    return None
+
+
+def _find_nearest_intersection_soa(ray, scene, ignore_surface=None, t_max=np.inf, any_hit=False):
+    """find_nearest_intersection for a SceneSOA, via the specialized, BVH or scalar SoA kernel"""
+    ignore_column = -1 if ignore_surface is None else scene.column_of(ignore_surface)
+    kernels = scene.kernels
+    if kernels is not None:
+        distance, column, nx, ny, nz = kernels.nearest_hit(
+            ray.ox, ray.oy, ray.oz, ray.dx, ray.dy, ray.dz, ignore_column, t_max, any_hit,
+        )
+    elif scene.bvh is not None:
+        distance, column, nx, ny, nz = nearest_hit_bvh(
+            ray.ox, ray.oy, ray.oz, ray.dx, ray.dy, ray.dz,
+            scene.sphere_centers, scene.sphere_radii_sq, scene.sphere_inv_radii,
+            scene.plane_normals, scene.plane_offsets,
+            scene.cube_mins, scene.cube_maxs,
+            *scene.bvh_arrays, ignore_column, t_max, any_hit,
+        )
+    else:
+        distance, column, nx, ny, nz = nearest_hit(
+            ray.ox, ray.oy, ray.oz, ray.dx, ray.dy, ray.dz,
+            scene.sphere_centers, scene.sphere_radii_sq, scene.sphere_inv_radii,
+            scene.plane_normals, scene.plane_offsets,
+            scene.cube_mins, scene.cube_maxs,
+            ignore_column, t_max, any_hit,
+        )
+    if column < 0:
+        return None
+
+    surface_index = int(scene.surface_ids[column])
+    surface = scene.surfaces[surface_index]
+    # Plane and cube normals come from a fixed set: share those arrays
+    if surface.kind == SURFACE_KIND_PLANE:
+        normal = surface.unit_normal
+    elif surface.kind == SURFACE_KIND_CUBE:
+        normal = FACE_NORMALS[nx, ny, nz]
+    else:
+        normal = np.array([nx, ny, nz])
+    return Intersection(
+        hit_point=ray.point_at(distance),
+        normal=normal,
+        distance=distance,
+        surface=surface,
+        surface_id=surface_index,
+    )
+
+
+def _find_nearest_intersection_vectorized(ray, scene, ignore_surface=None, t_max=np.inf):
+    """find_nearest_intersection for a SceneSOA, via the numpy SoA kernels"""
+    origin = np.array([ray.ox, ray.oy, ray.oz])
+    direction = np.array([[ray.dx, ray.dy, ray.dz]])
+    distances = scene.intersect_batch(origin, direction, out=scene.scratch_distances)[0]
+    ignore_column = -1 if ignore_surface is None else scene.column_of(ignore_surface)
+    if ignore_column >= 0:
+        distances[ignore_column] = np.inf
+
+    column = np.argmin(distances)
+    distance = float(distances[column])
+    if distance >= t_max:
+        return None
+
+    surface_index = int(scene.surface_ids[column])
+    hit_point = ray.point_at(distance)
+    normal = scene.normals_batch(np.array([surface_index]), hit_point[None, :], direction)[0]
+    return Intersection(
+        hit_point=hit_point,
+        normal=normal,
+        distance=distance,
+        surface=scene.surfaces[surface_index],
+        surface_id=surface_index,
+    )
+
+
+def find_nearest_intersection_batch(origins, directions, scene, ignore_surface=None):
+    """
+    Find the nearest surface intersection for a whole batch of rays
+
+    Uses the structure-of-arrays kernels in scene.py, so every surface type
+    is tested against all rays with a single broadcast numpy call. Prefer
+    find_nearest_intersection for single rays, where the per-call numpy
+    overhead of a batch of one outweighs the per-surface loop. For a scene
+    built with device='cuda', pass CuPy arrays and get CuPy arrays back.
+
+    Args:
+        origins: numpy array (R, 3) - Ray origins, or (3,) for one origin shared by all rays
+        directions: numpy array (R, 3) - Ray directions (normalized)
+        scene: SceneSOA built from the scene surfaces
+        ignore_surface: Optional surface object to ignore
+
+    Returns:
+        IntersectionBatch (distances, surface_indices) of the nearest hits
+    """
+    xp = array_module(origins, scene.sphere_centers)
+    if not scene.surfaces:
+        return IntersectionBatch(xp.full(len(directions), xp.inf), xp.full(len(directions), -1, dtype=xp.int64))
+
+    distances = scene.intersect_batch(origins, directions)
+    ignore_column = -1 if ignore_surface is None else scene.column_of(ignore_surface)
+    if ignore_column >= 0:
+        distances[:, ignore_column] = xp.inf
+
+    nearest_column = xp.argmin(distances, axis=1)
+    nearest_distance = distances[xp.arange(len(distances)), nearest_column]
+    surface_indices = xp.where(xp.isfinite(nearest_distance), scene.surface_ids[nearest_column], -1)
+    return IntersectionBatch(nearest_distance, surface_indices)
+
+
+def find_nearest_hits(origins, directions, scene):
+    """
+    Find the nearest hit, with its normal, of each ray of a batch
+
+    Per-ray counterpart of find_nearest_intersection_batch, for the
+    secondary rays of the shading passes: with Numba the rays go through
+    one compiled nearest-hit loop (specialized to the scene if it is small,
+    see specialize.py, else using the scene BVH, if any); without it they
+    are traced one by one.
+
+    Args:
+        origins: numpy array (R, 3) - Ray origins
+        directions: numpy array (R, 3) - Ray directions (normalized)
+        scene: SceneSOA built from the scene surfaces ('cpu' device)
+
+    Returns:
+        Tuple (distances, surface_indices, normals):
+            distances: numpy array (R,) - Distance to the nearest hit (np.inf on miss)
+            surface_indices: numpy int array (R,) - Index into scene.surfaces
+                             of the nearest hit surface, -1 on miss
+            normals: numpy array (R, 3) - Surface normal at each hit
+    """
+    ray_count = len(directions)
+    distances = np.full(ray_count, np.inf)
+    surface_indices = np.full(ray_count, -1, dtype=np.int32)
+    normals = np.zeros((ray_count, 3))
+    kernels = scene.kernels
+    if kernels is not None:
+        kernels.nearest_hit_rays(origins, directions, scene.surface_ids, distances, normals, surface_indices)
+        return distances, surface_indices, normals
+    if NUMBA_AVAILABLE:
+        nearest_hit_rays(
+            origins, directions,
+            scene.sphere_centers, scene.sphere_radii_sq, scene.sphere_inv_radii,
+            scene.plane_normals, scene.plane_offsets, scene.cube_mins, scene.cube_maxs, scene.surface_ids,
+            *scene.bvh_arrays,
+            distances, normals, surface_indices,
+        )
+        return distances, surface_indices, normals
+
+    # One Ray, re-pointed at each ray of the batch in turn
+    ray = Ray((0, 0, 0), (0, 0, 1))
+    for i in range(ray_count):
+        intersection = find_nearest_intersection(ray.reset(origins[i], directions[i]), scene)
+        if intersection is not None:
+            distances[i] = intersection.distance
+            surface_indices[i] = intersection.surface_id
+            normals[i] = intersection.normal
+    return distances, surface_indices, normals
+
+
+def find_any_intersection_batch(origins, directions, scene, t_max):
+    """
+    Find, for each ray of a batch, any surface hit closer than its t_max
+
+    Batch counterpart of find_any_intersection, for shadow rays. With Numba
+    the rays go through one compiled any-hit loop (specialized to the scene
+    if it is small); without it they are tested one by one.
+
+    Args:
+        origins: numpy array (R, 3) - Ray origins
+        directions: numpy array (R, 3) - Ray directions (normalized)
+        scene: SceneSOA built from the scene surfaces ('cpu' device)
+        t_max: numpy array (R,) - Only look for hits closer than this, per ray
+
+    Returns:
+        numpy int array (R,) - Index into scene.surfaces of a surface each ray
+        hits (not necessarily the nearest one), -1 if it hits nothing
+    """
+    surface_indices = np.empty(len(directions), dtype=np.int32)
+    kernels = scene.kernels
+    if kernels is not None:
+        kernels.any_hit_rays(origins, directions, t_max, scene.surface_ids, surface_indices)
+        return surface_indices
+    if NUMBA_AVAILABLE:
+        any_hit_rays(
+            origins, directions, t_max,
+            scene.sphere_centers, scene.sphere_radii_sq, scene.sphere_inv_radii,
+            scene.plane_normals, scene.plane_offsets, scene.cube_mins, scene.cube_maxs, scene.surface_ids,
+            *scene.bvh_arrays,
+            surface_indices,
+        )
+        return surface_indices
+
+    ray = Ray((0, 0, 0), (0, 0, 1))
+    for i in range(len(directions)):
+        intersection = find_any_intersection(ray.reset(origins[i], directions[i]), scene, t_max[i])
+        surface_indices[i] = -1 if intersection is None else intersection.surface_id
+    return surface_indices
+
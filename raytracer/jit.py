@@ -0,0 +1,29 @@
+"""
+Optional Numba support
+
+Numba is not a hard requirement: when it is not installed, njit becomes a
+no-op decorator, prange falls back to range and set_num_threads does
+nothing, so the kernels written for Numba still run as plain (scalar) Python.
+"""
+
+try:
+    from numba import njit, prange, set_num_threads
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that returns the function unchanged"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda function: function
+
+    def set_num_threads(count):
+        """Stand-in for numba.set_num_threads; there are no kernel threads"""
+
+# fastmath flags without 'nnan'/'ninf', since the kernels use inf to mean
+# "miss", and without 'arcp' or 'reassoc', which let the compiler rewrite the
+# plane and slab distances differently, so a plane and a coplanar cube face
+# would no longer compute bit-identical distances (speckled z-fighting)
+FASTMATH = {'nsz', 'contract', 'afn'}
@@ -1,6 +1,36 @@
 import numpy as np
-from ray import Ray
-from intersections import find_nearest_intersection
+from mathutils import normalize, norm3, reflect3
+from intersections import find_nearest_intersection_batch, find_nearest_hits, find_any_intersection_batch
+from scene import SceneSOA
+from jit import NUMBA_AVAILABLE
+from render_numba import shadow_visibility
+
+# Secondary rays whose color is scaled by less than this on its way to the
+# pixel cannot change it by even half a color level, so they are not traced
+MIN_THROUGHPUT = 0.5 / 255
+
+
+def _light_basis(to_light):
+    """
+    Basis (right, up) of a light's square, facing a hit point
+
+    The same closed form as in render_numba.shadow_visibility: the cross
+    products with a fixed axis are written out component-wise.
+
+    Args:
+        to_light: numpy array [x, y, z] - Vector from the hit point to the light
+
+    Returns:
+        Tuple (right, up) of unit numpy arrays perpendicular to to_light
+    """
+    lx, ly, lz = to_light / norm3(to_light)
+    if abs(lx) > 0.1:
+        right = normalize(np.array([-lz, 0.0, lx]))  # light direction x (0, 1, 0)
+    else:
+        right = normalize(np.array([0.0, lz, -ly]))  # light direction x (1, 0, 0)
+    rx, ry, rz = right
+    up = normalize(np.array([ly * rz - lz * ry, lz * rx - lx * rz, lx * ry - ly * rx]))
+    return right, up
 
 
 class LightingEngine:
@@ -8,7 +38,7 @@ class LightingEngine:
     Handles all lighting computations including:
     - Phong shading (diffuse + specular)
     - Hard and soft shadows
-    - Reflections (recursive)
+    - Reflections (traced bounce by bounce)
     - Transparency/refraction
     """
     
@@ -26,18 +56,52 @@ class LightingEngine:
         self.materials = materials
         self.lights = lights
         self.surfaces = surfaces
+        self.scene = SceneSOA(surfaces)
         self.background_color = np.array(scene_settings.background_color) * 255
         self.max_recursion = int(scene_settings.max_recursions)
         self.num_shadow_rays = int(scene_settings.root_number_shadow_rays)
+        # (row, column) of each cell of the N x N soft-shadow grid; shadow ray k
+        # aims at cell k
+        cells = np.arange(self.num_shadow_rays ** 2)
+        self.shadow_cells = np.stack([cells // self.num_shadow_rays, cells % self.num_shadow_rays], axis=1)
+
+        # Material table, one row per material (row = surface.material_row).
+        # Diffuse and specular colors are pre-scaled to [0, 255].
+        self.mat_diffuse = np.stack([np.array(m.diffuse_color, dtype=float) * 255 for m in materials])
+        self.mat_specular = np.stack([np.array(m.specular_color, dtype=float) * 255 for m in materials])
+        self.mat_reflect = np.stack([np.array(m.reflection_color, dtype=float) for m in materials])
+        self.mat_transp = np.array([m.transparency for m in materials], dtype=float)
+        self.mat_shine = np.array([m.shininess for m in materials], dtype=float)
+        self.mat_has_reflect = np.any(self.mat_reflect > 0, axis=1)
+        self.mat_reflect_max = self.mat_reflect.max(axis=1)
+        # Material row and transparency of each surface, indexed like scene.surfaces
+        self.surface_rows = np.array([s.material_row for s in surfaces], dtype=int)
+        self.surface_transp = self.mat_transp[self.surface_rows]
+        # The same transparencies in the column order of the scene kernels
+        self.column_transp = self.surface_transp[self.scene.surface_ids]
+
+        # Light table, one row per light (row = index into lights)
+        self.light_positions = np.array([l.position for l in lights], dtype=float).reshape(-1, 3)
+        self.light_colors = np.array([l.color for l in lights], dtype=float).reshape(-1, 3)
+        self.light_specular = np.array([l.specular_intensity for l in lights], dtype=float)
+        self.light_shadow = np.array([l.shadow_intensity for l in lights], dtype=float)
+        self.light_radii = np.array([l.radius for l in lights], dtype=float)
+
+        # Random generator for the soft-shadow samples (PCG64); render.py
+        # reseeds it for every band of rows it shades
+        self.rng = np.random.default_rng()
     
     def compute_color(self, ray_origin, ray_direction, intersection_data, recursion_depth=0):
         """
         Main color computation function - integrates all lighting effects
         
+        Single-ray form of shade; the reflection and transparency rays it
+        spawns are traced bounce by bounce there.
+        
         Args:
             ray_origin: Origin point of the ray (camera or reflection point)
             ray_direction: Direction vector of the ray (normalized)
-            intersection_data: Dict with keys: 'surface', 'hit_point', 'normal', 'distance'
+            intersection_data: Intersection of the ray (with surface set), or None on a miss
             recursion_depth: Current recursion level for reflections
             
         Returns:
@@ -46,270 +110,300 @@ class LightingEngine:
         if intersection_data is None:
             return self.background_color
         
-        # Extract intersection information
-        surface = intersection_data.surface
-        hit_point = intersection_data.hit_point
-        normal = intersection_data.normal
-        
-        # Get material properties
-        material = self.materials[surface.material_index - 1]  # material_index is 1-based
-        
-        # Initialize color components
-        diffuse_specular_color = np.zeros(3)
-        reflection_color = np.zeros(3)
-        background_color = np.zeros(3)
+        return self.shade(
+            np.array([ray_direction], dtype=float),
+            intersection_data.hit_point[None, :],
+            intersection_data.normal[None, :],
+            np.array([intersection_data.surface.material_row]),
+            recursion_depth,
+        )[0]
+    
+    def shade_hits(self, ray_directions, hits):
+        """
+        Colors of a batch of primary hits
         
-        # 1. Compute diffuse and specular lighting from all lights
-        for light in self.lights:
-            light_contribution = self.compute_light_contribution(
-                hit_point, normal, ray_direction, material, light
-            )
-            diffuse_specular_color += light_contribution
+        Args:
+            ray_directions: numpy array (R, 3) - Directions of the rays (normalized)
+            hits: numpy array (R,) of HIT_DTYPE - Their hits (all with surf_id >= 0)
+            
+        Returns:
+            numpy array (R, 3) - RGB colors in range [0, 255]
+        """
+        hit_points = np.stack([hits['px'], hits['py'], hits['pz']], axis=1).astype(float)
+        normals = np.stack([hits['nx'], hits['ny'], hits['nz']], axis=1).astype(float)
+        rows = self.surface_rows[hits['surf_id']]
+        return self.shade(np.asarray(ray_directions, dtype=float), hit_points, normals, rows)
+    
+    def shade(self, ray_directions, hit_points, normals, rows, recursion_depth=0, throughputs=None):
+        """
+        Colors of a batch of ray hits, with their reflections and transparency
         
-        # 2. Compute reflections (if material is reflective and recursion limit not reached)
-        if recursion_depth < self.max_recursion and np.any(np.array(material.reflection_color) > 0):
-            reflection_color = self.compute_reflection(
-                hit_point, ray_direction, normal, material, recursion_depth
-            )
+        Instead of recursing per ray, the secondary rays are traced as a
+        queue, one bounce (level) at a time: every hit of a level spawns
+        its reflection and transparency rays, which are all traced with one
+        find_nearest_hits call, and the rays that hit something form the
+        next level. Colors are then combined from the deepest level up.
         
-        # 3. Compute transparency (background objects visible through transparent surface)
-        if material.transparency > 0:
-            background_color = self.compute_transparency(
-                hit_point, ray_direction, material, recursion_depth
-            )
+        Each ray carries its throughput, the largest factor its color is
+        scaled by on the way to the pixel; rays whose throughput drops below
+        MIN_THROUGHPUT are not traced and contribute black.
         
-        # 4. Combine all color components using the transparency formula
+        Args:
+            ray_directions: numpy array (R, 3) - Directions of the incoming rays (normalized)
+            hit_points: numpy array (R, 3) - Hit points
+            normals: numpy array (R, 3) - Surface normals at the hit points
+            rows: numpy int array (R,) - Material table row of each hit surface
+            recursion_depth: int - Recursion level of these hits
+            throughputs: numpy array (R,) - Throughput of each ray (default: all 1)
+            
+        Returns:
+            numpy array (R, 3) - RGB colors in range [0, 255]
+        """
+        levels = []
+        depth = recursion_depth
+        if throughputs is None:
+            throughputs = np.ones(len(rows))
+        while len(rows):
+            # 1. Diffuse and specular lighting from all lights, with the
+            # shadows and Phong terms of each light computed for the whole
+            # level at once
+            direct = np.zeros((len(rows), 3))
+            for li in range(len(self.lights)):
+                intensities = self.compute_shadow_intensities(hit_points, li)
+                lit = np.flatnonzero(intensities)
+                direct[lit] += self.compute_light_contributions(
+                    hit_points[lit], normals[lit], ray_directions[lit], rows[lit], li, intensities[lit]
+                )
+            
+            # 2. Reflection rays (if the material is reflective and the
+            # recursion limit is not reached) and 3. transparency rays, which
+            # continue straight through the surface
+            reflect_throughputs = throughputs * self.mat_reflect_max[rows]
+            transparent_throughputs = throughputs * self.mat_transp[rows]
+            if depth < self.max_recursion:
+                reflective = np.flatnonzero(self.mat_has_reflect[rows] & (reflect_throughputs >= MIN_THROUGHPUT))
+            else:
+                reflective = np.empty(0, dtype=int)
+            transparent = np.flatnonzero((self.mat_transp[rows] > 0) & (transparent_throughputs >= MIN_THROUGHPUT))
+            
+            incident = ray_directions[reflective]
+            along_normal = 2 * (incident * normals[reflective]).sum(axis=1, keepdims=True)
+            child_directions = np.concatenate([
+                incident - along_normal * normals[reflective],
+                ray_directions[transparent],
+            ])
+            # Offset slightly to avoid self-intersection
+            child_origins = np.concatenate([hit_points[reflective], hit_points[transparent]])
+            child_origins += child_directions * 0.001
+            
+            lengths = np.sqrt((child_directions * child_directions).sum(axis=1, keepdims=True))
+            unit_directions = child_directions / lengths
+            distances, surface_ids, child_normals = find_nearest_hits(child_origins, unit_directions, self.scene)
+            hit = np.flatnonzero(surface_ids >= 0)
+            
+            levels.append((rows, direct, reflective, transparent, hit))
+            ray_directions = unit_directions[hit]
+            hit_points = child_origins[hit] + distances[hit, None] * unit_directions[hit]
+            normals = child_normals[hit]
+            rows = self.surface_rows[surface_ids[hit]]
+            throughputs = np.concatenate([reflect_throughputs[reflective], transparent_throughputs[transparent]])[hit]
+            depth += 1
+        
+        # 4. Combine all color components using the transparency formula,
+        # deepest level first:
         # output_color = (background_color * transparency) + 
         #                (diffuse + specular) * (1 - transparency) + 
         #                reflection_color
-        final_color = (
-            background_color * material.transparency +
-            diffuse_specular_color * (1 - material.transparency) +
-            reflection_color
-        )
-        
-        return np.clip(final_color, 0, 255)
+        colors = np.empty((0, 3))
+        for rows, direct, reflective, transparent, hit in reversed(levels):
+            # Colors seen by the traced secondary rays; the ones that missed see the background
+            child_colors = np.empty((len(reflective) + len(transparent), 3))
+            child_colors[:] = self.background_color
+            child_colors[hit] = colors
+            
+            # Accumulated in place in the direct term's array; the background
+            # and reflection terms are added only on the rows that have them.
+            # Clipped at every level, not just once at the end: each ray's
+            # clipped color is what its parent mixes in
+            transparency = self.mat_transp[rows][:, None]
+            colors = direct
+            colors *= 1 - transparency
+            colors[transparent] += child_colors[len(reflective):] * transparency[transparent]
+            colors[reflective] += child_colors[:len(reflective)] * self.mat_reflect[rows[reflective]]
+            np.clip(colors, 0, 255, out=colors)
+        
+        return colors
     
-    def compute_light_contribution(self, hit_point, normal, view_direction, material, light):
+    def compute_light_contributions(self, hit_points, normals, view_directions, rows, li, light_intensities):
         """
-        Compute the contribution of a single light source using Phong shading model
-        
+        Phong shading of one light source for a batch of hits
+
+        Every term is computed for the whole batch with (R, 3) array
+        operations, in place where possible, instead of allocating a few
+        3-vectors per hit.
+
         Args:
-            hit_point: Point on surface being lit
-            normal: Surface normal at hit point (normalized)
-            view_direction: Direction from hit point to camera (normalized)
-            material: Material object with diffuse, specular, shininess properties
-            light: Light object
-            
+            hit_points: numpy array (R, 3) - Points on surfaces being lit
+            normals: numpy array (R, 3) - Surface normals at the points (normalized)
+            view_directions: numpy array (R, 3) - Directions of the incoming rays (normalized)
+            rows: numpy int array (R,) - Material table row of each hit
+            li: int - Row of the light tables
+            light_intensities: numpy array (R,) - Shadow intensity of the light at each point
+
         Returns:
-            RGB color contribution from this light [r, g, b]
+            numpy array (R, 3) - RGB color contribution from this light at each point
         """
-        light_direction = self.normalize(np.array(light.position) - hit_point)
-        
-        # 2. Check if light is visible (compute shadow intensity)
-        light_intensity = self.compute_shadow_intensity(hit_point, light)
-        
-        if light_intensity == 0:
-            return np.zeros(3) # return if object is in the dark
-        
-        diffuse_intensity = max(0, np.dot(normal, light_direction))
-        diffuse_color = np.array(material.diffuse_color) * 255 * diffuse_intensity
-        
-        reflection_direction = self.reflect(-light_direction, normal)
-        
-        view_dir = self.normalize(-np.array(view_direction))
-        specular_intensity = max(0, np.dot(view_dir, reflection_direction))
-        specular_intensity = specular_intensity ** material.shininess
-        specular_color = np.array(material.specular_color) * 255 * specular_intensity * light.specular_intensity
+        to_light = self.light_positions[li] - hit_points
+        lengths = np.sqrt((to_light * to_light).sum(axis=1, keepdims=True))
+        np.divide(to_light, lengths, out=to_light, where=lengths != 0)
 
-        light_color = np.array(light.color)
-        combined_color = light_color * (diffuse_color + specular_color)
-        
-        return combined_color * light_intensity
-    
-    def compute_shadow_intensity(self, hit_point, light):
+        cosines = (normals * to_light).sum(axis=1)
+        diffuse_intensities = np.maximum(cosines, 0)
+
+        # Light direction reflected about the normal: 2 (n.l) n - l
+        reflected = normals * (2 * cosines)[:, None]
+        reflected -= to_light
+        specular_intensities = np.maximum(-(view_directions * reflected).sum(axis=1), 0)
+        specular_intensities **= self.mat_shine[rows]
+
+        colors = self.mat_diffuse[rows]
+        colors *= diffuse_intensities[:, None]
+        specular_colors = self.mat_specular[rows]
+        specular_colors *= specular_intensities[:, None]
+        specular_colors *= self.light_specular[li]
+        colors += specular_colors
+        colors *= self.light_colors[li]
+        colors *= light_intensities[:, None]
+        return colors
+
+    def compute_shadow_intensity(self, hit_point, li):
         """
         Compute shadow intensity using soft shadows (N×N shadow rays)
 
         Args:
             hit_point: Point on surface to check for shadows
-            light: Light object
+            li: int - Row of the light tables
             
         Returns:
             float: Light intensity at hit_point (0.0 = fully shadowed, 1.0 = fully lit)
         """
-        N = self.num_shadow_rays
-        light_position = np.array(light.position)
-        to_light = light_position - hit_point
-        distance_to_light = np.linalg.norm(to_light)
-        light_direction = to_light / distance_to_light
-        
-        # find two perpendicular vectors to light_direction
-        if abs(light_direction[0]) > 0.1:
-            right = self.normalize(np.cross(light_direction, np.array([0, 1, 0])))
-        else:
-            right = self.normalize(np.cross(light_direction, np.array([1, 0, 0])))
-        up = self.normalize(np.cross(light_direction, right))
+        if self.light_shadow[li] == 0:
+            return 1.0  # The light casts no shadows: nothing to trace
         
-        cell_size = light.radius / N
-        hits = 0
+        N = self.num_shadow_rays
+        light_position = self.light_positions[li]
+        light_radius = self.light_radii[li]
+        right, up = _light_basis(light_position - hit_point)
+        
+        # Stratified samples: shadow ray k aims at a random point in cell
+        # (k // N, k % N) of the N x N grid spanning the light
+        cell_size = light_radius / N
+        offsets = (self.shadow_cells + self.rng.random((N * N, 2))) * cell_size - light_radius / 2
+        to_samples = light_position + offsets[:, :1] * right + offsets[:, 1:] * up - hit_point
+        distances = np.sqrt((to_samples * to_samples).sum(axis=1))
+        directions = to_samples / distances[:, None]
+        # Offset to avoid self-intersection
+        origins = hit_point + directions * 0.001
+        
+        # Any hit decides the common cases: nothing in the way, or an opaque
+        # blocker. Only transparent blockers need the ordered walk.
+        blockers = find_any_intersection_batch(origins, directions, self.scene, distances)
+        visibility = (blockers < 0).astype(float)
+        walk = np.flatnonzero((blockers >= 0) & (self.surface_transp[blockers] > 0))
+        if len(walk):
+            visibility[walk] = self._trace_shadow_rays(origins[walk], directions[walk], distances[walk])
+        
+        hits = visibility.sum()
         total_rays = N * N
         
-        for i in range(N):
-            for j in range(N):
-                offset_x = (i + np.random.random()) * cell_size - light.radius / 2
-                offset_y = (j + np.random.random()) * cell_size - light.radius / 2
-                sample_point = light_position + right * offset_x + up * offset_y
-                
-                # Direction from hit point to sample point
-                to_sample = sample_point - hit_point
-                distance_to_sample = np.linalg.norm(to_sample)
-                sample_direction = to_sample / distance_to_sample
-                
-                # Offset to avoid self-intersection
-                shadow_ray_origin = hit_point + sample_direction * 0.001
-                
-                shadow_ray = Ray(shadow_ray_origin, sample_direction)
-                intersection = find_nearest_intersection(
-                    shadow_ray,
-                    self.surfaces
-                )
-                
-                # Trace through potentially multiple transparent objects
-                light_visibility = self._trace_shadow_ray(
-                    shadow_ray_origin,
-                    sample_direction,
-                    distance_to_sample
-                )
-                hits += light_visibility
-        
         hit_ratio = hits / total_rays
-        light_intensity = (1 - light.shadow_intensity) + light.shadow_intensity * hit_ratio
+        light_intensity = (1 - self.light_shadow[li]) + self.light_shadow[li] * hit_ratio
         return light_intensity
     
-    def _trace_shadow_ray(self, ray_origin, ray_direction, max_distance):
+    def compute_shadow_intensities(self, hit_points, li):
         """
-        Trace shadow ray through potentially multiple transparent objects
+        compute_shadow_intensity for a batch of hit points
+
+        With Numba, all N×N shadow rays of all the points are traced by one
+        parallel kernel (render_numba.shadow_visibility); without it the
+        points go through compute_shadow_intensity one by one.
 
         Args:
-            ray_origin: Starting point of shadow ray
-            ray_direction: Direction toward light (normalized)
-            max_distance: Maximum distance to trace (distance to light sample point)
-            
-        Returns:
-            float: Amount of light that reaches the destination (0.0 to 1.0)
-                  1.0 = fully lit (no blocking objects)
-                  0.0 = fully blocked (opaque object in the way)
-                  0.0-1.0 = partially blocked (transparent objects)
-        """
-        accumulated_transparency = 1.0  # Start with full light transmission
-        current_origin = ray_origin
-        remaining_distance = max_distance
-        
-        # Trace through all objects along the ray path
-        while remaining_distance > 0.001:
-            # Find next intersection
-            ray = Ray(current_origin, ray_direction)
-            intersection = find_nearest_intersection(
-                ray,
-                self.surfaces
-            )
-            
-            # No more intersections - light reaches destination
-            if intersection is None or intersection.distance > remaining_distance:
-                return accumulated_transparency
-            
-            blocking_surface = intersection.surface
-            blocking_material = self.materials[blocking_surface.material_index - 1]
-            
-            # Multiply accumulated transparency by this object's transparency
-            accumulated_transparency *= blocking_material.transparency
-            
-            if accumulated_transparency == 0:
-                return 0.0
-            
-            current_origin = intersection.hit_point + ray_direction * 0.001
-            remaining_distance -= (intersection.distance + 0.001)
-        
-        return accumulated_transparency
-    
-    def compute_reflection(self, hit_point, incident_direction, normal, material, recursion_depth):
-        """
-        Compute reflection color by shooting reflection ray
-        
-        Args:
-            hit_point: Point where ray hit the surface
-            incident_direction: Direction of incoming ray (normalized)
-            normal: Surface normal (normalized)
-            material: Material object
-            recursion_depth: Current recursion level
-            
+            hit_points: numpy array (R, 3) - Points on surfaces to check for shadows
+            li: int - Row of the light tables
+
         Returns:
-            RGB color from reflection [r, g, b]
+            numpy array (R,) - Light intensity at each point (0.0 = fully
+            shadowed, 1.0 = fully lit)
         """
-        reflection_direction = self.reflect(incident_direction, normal)
-        
-        reflection_origin = hit_point + reflection_direction * 0.001
-        
-        reflection_ray = Ray(reflection_origin, reflection_direction)
-        intersection = find_nearest_intersection(
-            reflection_ray,
-            self.surfaces
-        )
-        
+        if self.light_shadow[li] == 0:
+            return np.ones(len(hit_points))  # The light casts no shadows: nothing to trace
+        if not NUMBA_AVAILABLE:
+            return np.array([self.compute_shadow_intensity(point, li) for point in hit_points])
 
-        reflected_color = self.compute_color(
-            reflection_origin,
-            reflection_direction,
-            intersection,
-            recursion_depth + 1
+        N = self.num_shadow_rays
+        scene = self.scene
+        visibility = np.empty(len(hit_points))
+        shadow_visibility(
+            np.ascontiguousarray(hit_points, dtype=float), self.light_positions[li],
+            self.light_radii[li], N, self.rng.random((len(hit_points), N * N, 2)),
+            scene.sphere_centers, scene.sphere_radii_sq, scene.sphere_inv_radii,
+            scene.plane_normals, scene.plane_offsets, scene.cube_mins, scene.cube_maxs,
+            self.column_transp, *scene.bvh_arrays,
+            visibility,
         )
-        
-        reflection_color = np.array(material.reflection_color)
-        final_reflection = reflected_color * reflection_color
-        
-        return final_reflection
-    
-    def compute_transparency(self, hit_point, ray_direction, material, recursion_depth):
+        return (1 - self.light_shadow[li]) + self.light_shadow[li] * visibility
+
+    def _trace_shadow_rays(self, origins, directions, max_distances):
         """
-        Compute color of objects behind transparent surface
-        
+        Trace shadow rays through potentially multiple transparent objects
+
+        Walks the hits of all the rays in order, one hit per step, with one
+        batched intersection call per step; rays leave the batch once they
+        reach their light sample or are fully blocked. Only worth calling
+        for rays whose any-hit blocker is transparent.
+
         Args:
-            hit_point: Point on transparent surface
-            ray_direction: Direction of ray through surface
-            material: Material object
-            recursion_depth: Current recursion level
+            origins: numpy array (K, 3) - Starting points of the shadow rays
+            directions: numpy array (K, 3) - Directions toward the light (normalized)
+            max_distances: numpy array (K,) - Distance to trace (to the light sample point)
             
         Returns:
-            RGB color of background objects [r, g, b]
+            numpy array (K,) - Amount of light that reaches each destination (0.0 to 1.0)
+                               1.0 = fully lit (no blocking objects)
+                               0.0 = fully blocked (opaque object in the way)
+                               0.0-1.0 = partially blocked (transparent objects)
         """
-        # Offset slightly to avoid self-intersection
-        transparency_origin = hit_point + ray_direction * 0.001
+        transmitted = np.ones(len(origins))  # Start with full light transmission
+        origins = np.array(origins, dtype=float)
+        remaining = np.array(max_distances, dtype=float)
         
-        transparency_ray = Ray(transparency_origin, ray_direction)
-        intersection = find_nearest_intersection(
-            transparency_ray,
-            self.surfaces
-        )
+        active = np.flatnonzero(remaining > 0.001)
+        while len(active):
+            distances, surface_ids = find_nearest_intersection_batch(origins[active], directions[active], self.scene)
+            
+            # Rays with no more intersections before their light sample are done
+            blocked = (surface_ids >= 0) & (distances < remaining[active])
+            active, distances, surface_ids = active[blocked], distances[blocked], surface_ids[blocked]
+            
+            # Multiply accumulated transparency by this object's transparency
+            transmitted[active] *= self.surface_transp[surface_ids]
+            
+            # Continue just past the hit point
+            origins[active] += distances[:, None] * directions[active]
+            origins[active] += directions[active] * 0.001
+            remaining[active] -= distances + 0.001
+            active = active[(transmitted[active] > 0) & (remaining[active] > 0.001)]
         
-        background_color = self.compute_color(
-            transparency_origin,
-            ray_direction,
-            intersection,
-            recursion_depth + 1
-        )
-        return background_color
+        return transmitted
     
     def normalize(self, vector):
         """Utility: Normalize a vector"""
-        norm = np.linalg.norm(vector)
-        if norm == 0:
-            return vector
-        return vector / norm
+        return normalize(vector)
     
     def reflect(self, incident, normal):
         """
         Utility: Reflect incident vector around normal
         Formula: incident - 2 * dot(incident, normal) * normal
         """
-        return incident - 2 * np.dot(incident, normal) * normal
+        return np.array(reflect3(*incident, *normal))
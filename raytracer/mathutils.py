@@ -1,11 +1,44 @@
+import math
 import numpy as np
 
+# Precision of the bulk ray, hit and scene arrays; single precision is plenty
+# for them and halves the memory traffic of the batched kernels
+REAL = np.float32
+
+# Byte alignment of the scene arrays: one cache line
+CACHE_LINE = 64
+
+
+def aligned(array, alignment=CACHE_LINE):
+    """C-contiguous copy of array whose data starts on an alignment-byte boundary"""
+    array = np.asarray(array)
+    buffer = np.empty(array.nbytes + alignment, dtype=np.uint8)
+    offset = -buffer.ctypes.data % alignment
+    out = buffer[offset:offset + array.nbytes].view(array.dtype).reshape(array.shape)
+    out[...] = array
+    return out
+
+
 # Helper functions for vector operations
+# Written out per component: for 3-vectors numpy's per-call dispatch costs
+# far more than the arithmetic itself
 def cross(a, b):
-    return np.cross(a, b)
+    return np.array([
+        a[1] * b[2] - a[2] * b[1],
+        a[2] * b[0] - a[0] * b[2],
+        a[0] * b[1] - a[1] * b[0],
+    ])
 
 def normalize(v):
-    norm = np.linalg.norm(v)
+    norm = math.sqrt(v[0] * v[0] + v[1] * v[1] + v[2] * v[2])
     if norm == 0:
         return v
-    return v / norm
\ No newline at end of file
+    return v * (1.0 / norm)
+
+def norm3(v):
+    return math.sqrt(v[0] * v[0] + v[1] * v[1] + v[2] * v[2])
+
+def reflect3(ix, iy, iz, nx, ny, nz):
+    # Reflect (ix, iy, iz) around the unit normal (nx, ny, nz), as a tuple
+    d = 2 * (ix * nx + iy * ny + iz * nz)
+    return ix - d * nx, iy - d * ny, iz - d * nz
@@ -1,50 +1,101 @@
+import math
 import numpy as np
 
 
 class Ray:
     """
     Represents a ray in 3D space
-    
+
     A ray is defined by: P(t) = origin + t * direction
     where t >= 0
+
+    The components are stored as plain floats (ox, oy, oz, dx, dy, dz) so
+    that creating a ray and testing it against surfaces allocates no numpy
+    arrays; origin and direction build arrays on demand. inv_dx, inv_dy,
+    inv_dz hold 1 / direction (inf on zero components), precomputed for the
+    cube slab test.
     """
-    
+
+    __slots__ = ('ox', 'oy', 'oz', 'dx', 'dy', 'dz', 'inv_dx', 'inv_dy', 'inv_dz')
+
     def __init__(self, origin, direction):
         """
         Create a ray with given origin and direction
-        
+
         Args:
             origin: numpy array [x, y, z] or list - Starting point of the ray
             direction: numpy array [x, y, z] or list - Direction vector (will be normalized)
         """
-        self.origin = np.array(origin, dtype=float)
-        self.direction = self.normalize(np.array(direction, dtype=float))
-    
-    def point_at(self, t):
+        self.reset(origin, direction)
+
+    def reset(self, origin, direction):
+        """
+        Point this ray somewhere else, in place
+
+        Lets a caller that traces many rays one after another reuse a single
+        Ray object instead of allocating a new one for each.
+
+        Args:
+            origin: numpy array [x, y, z] or list - Starting point of the ray
+            direction: numpy array [x, y, z] or list - Direction vector (will be normalized)
+
+        Returns:
+            The ray itself
+        """
+        self.ox, self.oy, self.oz = float(origin[0]), float(origin[1]), float(origin[2])
+        dx, dy, dz = float(direction[0]), float(direction[1]), float(direction[2])
+
+        # Returns the direction unchanged if its length is 0
+        norm = math.sqrt(dx * dx + dy * dy + dz * dz)
+        if norm != 0:
+            dx, dy, dz = dx / norm, dy / norm, dz / norm
+        self.dx, self.dy, self.dz = dx, dy, dz
+        self.inv_dx = 1.0 / dx if dx != 0 else math.inf
+        self.inv_dy = 1.0 / dy if dy != 0 else math.inf
+        self.inv_dz = 1.0 / dz if dz != 0 else math.inf
+        return self
+
+    @property
+    def origin(self):
+        """numpy array [x, y, z] - Starting point of the ray"""
+        return np.array([self.ox, self.oy, self.oz])
+
+    @property
+    def direction(self):
+        """numpy array [x, y, z] - Direction of the ray (normalized)"""
+        return np.array([self.dx, self.dy, self.dz])
+
+    def point_at(self, t, out=None):
         """
         Get point along ray at parameter t
-        
+
         Formula: P(t) = origin + t * direction
-        
+
         Args:
             t: float - Distance parameter along ray (t >= 0)
-            
+            out: Optional numpy array of length 3 to write the point into
+
         Returns:
-            numpy array [x, y, z] - Point at distance t along the ray
+            numpy array [x, y, z] - Point at distance t along the ray (out, if given)
         """
-        return self.origin + t * self.direction
-    
+        if out is None:
+            out = np.empty(3)
+        out[0] = self.ox + t * self.dx
+        out[1] = self.oy + t * self.dy
+        out[2] = self.oz + t * self.dz
+        return out
+
     @staticmethod
     def normalize(vector):
         """
         Normalize a vector to unit length
-        
+
         Args:
             vector: numpy array - Vector to normalize
-            
+
         Returns:
             numpy array - Normalized vector (length = 1)
-            
+
         Note:
             Returns original vector if length is 0 (to avoid division by zero)
         """
@@ -52,7 +103,7 @@ class Ray:
         if norm == 0:
             return vector
         return vector / norm
-    
+
     def __repr__(self):
         """String representation for debugging"""
         return f"Ray(origin={self.origin}, direction={self.direction})"
@@ -10,8 +10,20 @@ from surfaces.cube import Cube
 from surfaces.infinite_plane import InfinitePlane
 from surfaces.sphere import Sphere
 from lighting import LightingEngine
-from intersections import find_nearest_intersection
-from ray import Ray
+from intersections import find_nearest_intersection_batch
+from intersection import HIT_DTYPE
+from jit import NUMBA_AVAILABLE
+from render_numba import trace_primary
+from render_cuda import CUDA_AVAILABLE, trace_primary_cuda
+from render import render_image
+from scene import SceneSOA
+from device import DEVICES, device_module, to_numpy
+from mathutils import REAL
+
+# Rays per call of the batched numpy kernels on the CPU: enough to amortize
+# the per-call overhead, small enough that the (rays, surfaces) distance
+# matrix stays in cache
+PRIMARY_BATCH_RAYS = 16384
 
 
 def parse_scene_file(file_path):
@@ -50,9 +62,65 @@ def parse_scene_file(file_path):
     return camera, scene_settings, objects
 
 
+def trace_primary_rays(camera, scene, image_width, image_height, device='cpu'):
+    """
+    Find the nearest hit of every primary ray
+
+    On the CPU, uses the compiled tile kernel when Numba is available, and
+    the batched numpy kernels over PRIMARY_BATCH_RAYS rays at a time
+    otherwise. With device='cuda' the whole image is traced at once on the
+    GPU: one thread per ray with Numba CUDA, or the batched kernels under CuPy.
+
+    Returns:
+        Tuple (directions, hits): (H*W, 3) unit ray directions and the
+        (H*W,) HIT_DTYPE hit records, one row per pixel in row-major order
+    """
+    if device == 'cpu' and NUMBA_AVAILABLE:
+        return trace_primary(camera, scene, image_width, image_height)
+    if device == 'cuda' and CUDA_AVAILABLE:
+        return trace_primary_cuda(camera, scene, image_width, image_height)
+
+    # All primary rays share the camera position, which the batch kernels
+    # broadcast instead of reading an (H*W, 3) origins array
+    _, directions = camera.generate_rays_grid(image_width, image_height, normalized=True)
+    hits = np.zeros(len(directions), dtype=HIT_DTYPE)
+
+    if device != 'cpu':
+        xp = device_module(device)
+        device_scene = SceneSOA(scene.surfaces, device=device)
+        batch_size = len(directions)
+    else:
+        xp = np
+        device_scene = scene
+        batch_size = PRIMARY_BATCH_RAYS
+    origin = xp.asarray(camera.position.astype(REAL))
+
+    for start in range(0, len(directions), batch_size):
+        batch = slice(start, start + batch_size)
+        batch_directions = xp.asarray(directions[batch])
+        distances, surface_indices = find_nearest_intersection_batch(
+            origin, batch_directions, device_scene
+        )
+        hit = surface_indices >= 0
+        hit_points = origin + distances[hit, None] * batch_directions[hit]
+        normals = device_scene.normals_batch(surface_indices[hit], hit_points, batch_directions[hit])
+
+        hit = to_numpy(hit)
+        hit_points = to_numpy(hit_points)
+        normals = to_numpy(normals)
+        batch_hits = hits[batch]
+        batch_hits['t'] = to_numpy(distances)
+        batch_hits['surf_id'] = to_numpy(surface_indices)
+        for axis, (point_field, normal_field) in enumerate((('px', 'nx'), ('py', 'ny'), ('pz', 'nz'))):
+            batch_hits[point_field][hit] = hit_points[:, axis]
+            batch_hits[normal_field][hit] = normals[:, axis]
+
+    return directions, hits
+
+
 def save_image(image_array, output_path):
     """Save the rendered image to a file"""
-    image = Image.fromarray(np.uint8(image_array))
+    image = Image.fromarray(np.clip(image_array, 0, 255).astype(np.uint8))
     image.save(output_path)
 
 
@@ -62,6 +130,12 @@ def main():
     parser.add_argument('output_image', type=str, help='Name of the output image file')
     parser.add_argument('--width', type=int, default=500, help='Image width')
     parser.add_argument('--height', type=int, default=500, help='Image height')
+    parser.add_argument('--device', choices=DEVICES, default='cpu',
+                        help='Device for the primary ray pass (cuda requires Numba CUDA or CuPy)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Shading processes (default: one per CPU, 1 to shade in-process)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed for the soft-shadow samples (same seed, same image)')
     args = parser.parse_args()
 
     # Parse the scene file
@@ -83,37 +157,24 @@ def main():
     # Initialize the lighting engine
     lighting_engine = LightingEngine(scene_settings, materials, lights, surfaces)
     
-    # Create image array
+    # Image size
     image_width = args.width
     image_height = args.height
-    image_array = np.zeros((image_height, image_width, 3))
     
     print(f"Rendering {image_width}x{image_height} image...")
     print(f"Scene: {len(surfaces)} surfaces, {len(lights)} lights, {len(materials)} materials")
     print(f"Settings: {int(scene_settings.root_number_shadow_rays)}x{int(scene_settings.root_number_shadow_rays)} shadow rays, max recursion: {int(scene_settings.max_recursions)}")
     
-    # Ray trace each pixel
-    for y in range(image_height):
-        if y % 50 == 0:
-            print(f"Progress: {y}/{image_height} rows ({100*y//image_height}%)")
-        
-        for x in range(image_width):
-            # Generate ray through this pixel
-            ray = camera.generate_ray(x, y, image_width, image_height)
-            
-            # Find nearest intersection
-            intersection = find_nearest_intersection(ray, surfaces)
-            
-            # Compute color using lighting engine
-            color = lighting_engine.compute_color(
-                ray.origin,
-                ray.direction,
-                intersection,
-                recursion_depth=0
-            )
-            
-            # Store color in image array
-            image_array[y, x] = color
+    # Find the nearest hit of every primary ray up front
+    ray_directions, hits = trace_primary_rays(
+        camera, lighting_engine.scene, image_width, image_height, args.device
+    )
+
+    # Shade the image, in parallel over bands of rows
+    image_array = render_image(
+        lighting_engine, ray_directions, hits,
+        image_width, image_height, workers=args.workers, seed=args.seed
+    )
     
     print("Rendering complete!")
     
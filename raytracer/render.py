@@ -0,0 +1,125 @@
+"""
+CPU-parallel shading
+
+Shades the image in bands of rows. The bands are independent, so they can
+be handed to a pool of worker processes, which sidesteps the GIL for the
+Python-level shading loop. Each worker receives the lighting engine and
+the primary hits once, when it starts, not once per band.
+
+The soft-shadow samples of a band are drawn from a generator seeded with
+(seed, first row), so an image depends only on the seed, not on the
+number of workers or on which of them shades which band.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from jit import set_num_threads
+from mathutils import REAL
+
+TILE_ROWS = 16
+
+# Per-process render state, set by _init_worker
+_worker_state = {}
+
+
+def render_tile(lighting_engine, ray_directions, hits, image_width, y0, y1, seed=0):
+    """
+    Shade the image rows [y0, y1)
+
+    Args:
+        lighting_engine: LightingEngine for the scene
+        ray_directions: numpy array (H*W, 3) - Primary ray directions
+        hits: numpy array (H*W,) of HIT_DTYPE - Primary hits
+        image_width: int - Total width of image in pixels
+        y0: int - First row to shade
+        y1: int - One past the last row to shade
+        seed: int - Seed of the soft-shadow samples (combined with y0)
+
+    Returns:
+        numpy array (y1 - y0, W, 3) - Colors of the rows
+    """
+    lighting_engine.rng = np.random.default_rng([seed, y0])
+    start, end = y0 * image_width, y1 * image_width
+    tile_hits = hits[start:end]
+
+    # Primary rays that miss see the background: fill them all at once and
+    # shade the pixels that hit something as one batch
+    missed = (tile_hits['surf_id'] < 0)[:, None]
+    tile = np.where(missed, lighting_engine.background_color, 0.0)
+
+    shaded = np.flatnonzero(~missed[:, 0])
+    tile[shaded] = lighting_engine.shade_hits(ray_directions[start:end][shaded], tile_hits[shaded])
+
+    return tile.reshape(y1 - y0, image_width, 3)
+
+
+def _init_worker(lighting_engine, ray_directions, hits, image_width, seed):
+    """Store the render state in a worker process"""
+    _worker_state.update(
+        lighting_engine=lighting_engine,
+        ray_directions=ray_directions,
+        hits=hits,
+        image_width=image_width,
+        seed=seed,
+    )
+    # The pool already keeps every CPU busy; threaded kernels inside each
+    # worker would only oversubscribe them
+    set_num_threads(1)
+
+
+def _render_worker_tile(y0, y1):
+    """render_tile with the state stored by _init_worker"""
+    return render_tile(y0=y0, y1=y1, **_worker_state)
+
+
+def render_image(lighting_engine, ray_directions, hits, image_width, image_height,
+                 workers=None, tile_rows=TILE_ROWS, seed=0):
+    """
+    Shade the whole image, in parallel over bands of rows
+
+    Args:
+        lighting_engine: LightingEngine for the scene
+        ray_directions: numpy array (H*W, 3) - Primary ray directions
+        hits: numpy array (H*W,) of HIT_DTYPE - Primary hits
+        image_width: int - Total width of image in pixels
+        image_height: int - Total height of image in pixels
+        workers: int - Number of worker processes (default: one per CPU);
+                 1 shades in the current process
+        tile_rows: int - Number of rows per band
+        seed: int - Seed of the soft-shadow samples
+
+    Returns:
+        numpy array (H, W, 3) - The shaded image
+    """
+    workers = workers or os.cpu_count() or 1
+    image_array = np.zeros((image_height, image_width, 3), dtype=REAL)
+    bands = [(y, min(y + tile_rows, image_height)) for y in range(0, image_height, tile_rows)]
+
+    if workers == 1:
+        for y0, y1 in bands:
+            image_array[y0:y1] = render_tile(
+                lighting_engine, ray_directions, hits, image_width, y0, y1, seed
+            )
+            print(f"Progress: {y1}/{image_height} rows ({100*y1//image_height}%)")
+        return image_array
+
+    # spawn rather than fork: forking after Numba has started its threading
+    # layer is not safe
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(lighting_engine, ray_directions, hits, image_width, seed),
+    ) as executor:
+        futures = {executor.submit(_render_worker_tile, y0, y1): (y0, y1) for y0, y1 in bands}
+        rows_done = 0
+        for future in as_completed(futures):
+            y0, y1 = futures[future]
+            image_array[y0:y1] = future.result()
+            rows_done += y1 - y0
+            print(f"Progress: {rows_done}/{image_height} rows ({100*rows_done//image_height}%)")
+
+    return image_array
@@ -0,0 +1,175 @@
+"""
+Primary-ray tracing on the GPU with Numba CUDA
+
+One CUDA thread per primary ray, each running the sphere, plane and cube
+tests of intersect_numba.py (compiled for the GPU from the same source)
+over the flat scene arrays. The scene is copied to the device once per
+frame and reused by every thread.
+
+Like CuPy, Numba CUDA is optional: CUDA_AVAILABLE is False when numba.cuda
+is missing or finds no GPU, and callers fall back to the CuPy or CPU paths.
+"""
+
+import types
+import numpy as np
+from intersection import HIT_DTYPE
+from intersect_numba import INF, sphere_hit, plane_hit, _slab, cube_hit
+from mathutils import REAL
+
+try:
+    from numba import cuda
+    CUDA_AVAILABLE = cuda.is_available()
+except ImportError:
+    cuda = None
+    CUDA_AVAILABLE = False
+
+# Threads per block of the primary-ray kernel
+THREADS_PER_BLOCK = 256
+
+
+def _device_function(kernel, **device_functions):
+    """
+    Compile a scalar kernel of intersect_numba.py as a CUDA device function
+
+    The device function is built from the kernel's Python source, so the CPU
+    and GPU share one implementation.
+
+    Args:
+        kernel: Numba dispatcher from intersect_numba.py
+        device_functions: Device functions to call instead of the kernels of
+                          the same names that kernel calls
+
+    Returns:
+        CUDA device function
+    """
+    function = kernel.py_func
+    if device_functions:
+        function = types.FunctionType(
+            function.__code__, {**function.__globals__, **device_functions},
+            function.__name__, function.__defaults__,
+        )
+    return cuda.jit(device=True)(function)
+
+
+if CUDA_AVAILABLE:
+
+    _sphere_hit = _device_function(sphere_hit)
+    _plane_hit = _device_function(plane_hit)
+    _cube_hit = _device_function(cube_hit, _slab=_device_function(_slab))
+
+    @cuda.jit
+    def _trace_primary_kernel(origin, directions,
+                              sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                              plane_normals, plane_offsets, cube_mins, cube_maxs, surface_ids,
+                              out_t, out_normals, out_surface_ids):
+        """Nearest hit of ray i = cuda.grid(1); one thread per ray"""
+        i = cuda.grid(1)
+        if i >= directions.shape[0]:
+            return
+
+        ox, oy, oz = origin[0], origin[1], origin[2]
+        dx, dy, dz = directions[i, 0], directions[i, 1], directions[i, 2]
+        best_t = INF
+        best_column = -1
+        best_nx, best_ny, best_nz = 0.0, 0.0, 0.0
+        column = 0
+
+        for s in range(sphere_radii_sq.shape[0]):
+            t, nx, ny, nz = _sphere_hit(
+                ox, oy, oz, dx, dy, dz,
+                sphere_centers[s, 0], sphere_centers[s, 1], sphere_centers[s, 2],
+                sphere_radii_sq[s], sphere_inv_radii[s], best_t,
+            )
+            if t < best_t:
+                best_t, best_column = t, column
+                best_nx, best_ny, best_nz = nx, ny, nz
+            column += 1
+
+        for p in range(plane_offsets.shape[0]):
+            t, nx, ny, nz = _plane_hit(
+                ox, oy, oz, dx, dy, dz,
+                plane_normals[p, 0], plane_normals[p, 1], plane_normals[p, 2],
+                plane_offsets[p], best_t,
+            )
+            if t < best_t:
+                best_t, best_column = t, column
+                best_nx, best_ny, best_nz = nx, ny, nz
+            column += 1
+
+        inv_dx = 1.0 / dx if dx != 0 else INF
+        inv_dy = 1.0 / dy if dy != 0 else INF
+        inv_dz = 1.0 / dz if dz != 0 else INF
+        for c in range(cube_mins.shape[0]):
+            t, nx, ny, nz = _cube_hit(
+                ox, oy, oz, dx, dy, dz, inv_dx, inv_dy, inv_dz,
+                cube_mins[c, 0], cube_mins[c, 1], cube_mins[c, 2],
+                cube_maxs[c, 0], cube_maxs[c, 1], cube_maxs[c, 2], best_t,
+            )
+            if t < best_t:
+                best_t, best_column = t, column
+                best_nx, best_ny, best_nz = nx, ny, nz
+            column += 1
+
+        out_t[i] = best_t
+        out_normals[i, 0] = best_nx
+        out_normals[i, 1] = best_ny
+        out_normals[i, 2] = best_nz
+        out_surface_ids[i] = surface_ids[best_column] if best_column >= 0 else -1
+
+
+def scene_to_device(scene):
+    """
+    Copy the scene arrays a kernel launch needs to the GPU
+
+    Args:
+        scene: SceneSOA built with device='cpu'
+
+    Returns:
+        Tuple of device arrays, in the argument order of the kernel
+    """
+    return tuple(
+        cuda.to_device(np.ascontiguousarray(array)) for array in (
+            scene.sphere_centers, scene.sphere_radii_sq, scene.sphere_inv_radii,
+            scene.plane_normals, scene.plane_offsets, scene.cube_mins, scene.cube_maxs,
+            scene.surface_ids,
+        )
+    )
+
+
+def trace_primary_cuda(camera, scene, image_width, image_height):
+    """
+    Primary hits for the whole image on the GPU, one thread per ray
+
+    Args:
+        camera: Camera object
+        scene: SceneSOA with the scene surfaces (device='cpu')
+        image_width: int - Total width of image in pixels
+        image_height: int - Total height of image in pixels
+
+    Returns:
+        Tuple (directions, hits): (H*W, 3) unit ray directions and the
+        (H*W,) HIT_DTYPE hit records, one row per pixel in row-major order
+    """
+    _, directions = camera.generate_rays_grid(image_width, image_height, normalized=True)
+    origin = camera.position.astype(REAL)
+    ray_count = len(directions)
+
+    out_t = cuda.device_array(ray_count, dtype=REAL)
+    out_normals = cuda.device_array((ray_count, 3), dtype=REAL)
+    out_surface_ids = cuda.device_array(ray_count, dtype=np.int32)
+    blocks = (ray_count + THREADS_PER_BLOCK - 1) // THREADS_PER_BLOCK
+    _trace_primary_kernel[blocks, THREADS_PER_BLOCK](
+        cuda.to_device(origin), cuda.to_device(directions), *scene_to_device(scene),
+        out_t, out_normals, out_surface_ids,
+    )
+
+    hits = np.zeros(ray_count, dtype=HIT_DTYPE)
+    hits['t'] = out_t.copy_to_host()
+    hits['surf_id'] = out_surface_ids.copy_to_host()
+    normals = out_normals.copy_to_host()
+    hit = hits['surf_id'] >= 0
+    hit_points = origin + hits['t'][hit, None] * directions[hit]
+    for axis, (point_field, normal_field) in enumerate((('px', 'nx'), ('py', 'ny'), ('pz', 'nz'))):
+        hits[point_field][hit] = hit_points[:, axis]
+        hits[normal_field][hit] = normals[hit, axis]
+    return directions, hits
@@ -0,0 +1,316 @@
+"""
+Compiled ray tracing kernels
+
+Fuses primary ray generation and nearest-hit search into one Numba kernel
+that walks the image in square tiles, one tile per parallel iteration, so
+no Ray or Intersection object is created per pixel. Batches of secondary
+and shadow rays get compiled nearest-hit and any-hit loops as well; the
+nearest-hit loop runs its rays in parallel too. Soft shadows have a
+kernel of their own, which samples the area light and walks through
+transparent blockers for a whole batch of hit points at once.
+"""
+
+import math
+import numpy as np
+from jit import njit, prange, FASTMATH
+from intersect_numba import nearest_hit
+from bvh import nearest_hit_bvh
+from intersection import HIT_DTYPE
+from mathutils import REAL
+
+TILE_SIZE = 64
+
+
+@njit(parallel=True, fastmath=FASTMATH, cache=True)
+def trace_primary_tiles(image_width, image_height, tile_size,
+                        position, screen_center, right, up,
+                        screen_width, screen_height,
+                        sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                        plane_normals, plane_offsets, cube_mins, cube_maxs, surface_ids,
+                        node_min, node_max, node_child, node_prim_count,
+                        prim_indices, stack_size,
+                        out_directions, out_hits):
+    """
+    Trace the primary ray of every pixel, tile by tile
+
+    Pixel (x, y) is written to row y * image_width + x of out_directions
+    (H*W, 3) and of out_hits, a (H*W,) HIT_DTYPE record array. The node_*
+    arrays are the scene BVH; with no nodes the surfaces are scanned linearly.
+    """
+    use_bvh = node_prim_count.shape[0] > 0
+    tiles_x = (image_width + tile_size - 1) // tile_size
+    tiles_y = (image_height + tile_size - 1) // tile_size
+
+    for tile in prange(tiles_x * tiles_y):
+        y0 = (tile // tiles_x) * tile_size
+        x0 = (tile % tiles_x) * tile_size
+
+        for y in range(y0, min(y0 + tile_size, image_height)):
+            # Flip Y as image coordinates start at top-left
+            screen_y = (0.5 - (y + 0.5) / image_height) * screen_height
+
+            for x in range(x0, min(x0 + tile_size, image_width)):
+                screen_x = ((x + 0.5) / image_width - 0.5) * screen_width
+
+                dx = screen_center[0] - right[0] * screen_x + up[0] * screen_y - position[0]
+                dy = screen_center[1] - right[1] * screen_x + up[1] * screen_y - position[1]
+                dz = screen_center[2] - right[2] * screen_x + up[2] * screen_y - position[2]
+                inv_length = 1.0 / math.sqrt(dx * dx + dy * dy + dz * dz)
+                dx *= inv_length
+                dy *= inv_length
+                dz *= inv_length
+
+                if use_bvh:
+                    t, column, nx, ny, nz = nearest_hit_bvh(
+                        position[0], position[1], position[2], dx, dy, dz,
+                        sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                        plane_normals, plane_offsets, cube_mins, cube_maxs,
+                        node_min, node_max, node_child, node_prim_count,
+                        prim_indices, stack_size,
+                    )
+                else:
+                    t, column, nx, ny, nz = nearest_hit(
+                        position[0], position[1], position[2], dx, dy, dz,
+                        sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                        plane_normals, plane_offsets, cube_mins, cube_maxs,
+                    )
+
+                i = y * image_width + x
+                out_directions[i, 0] = dx
+                out_directions[i, 1] = dy
+                out_directions[i, 2] = dz
+
+                hit = out_hits[i]
+                hit.t = t
+                if column < 0:
+                    hit.surf_id = -1
+                    continue
+                hit.px = position[0] + t * dx
+                hit.py = position[1] + t * dy
+                hit.pz = position[2] + t * dz
+                hit.nx = nx
+                hit.ny = ny
+                hit.nz = nz
+                hit.surf_id = surface_ids[column]
+
+
+@njit(parallel=True, fastmath=FASTMATH, cache=True)
+def nearest_hit_rays(origins, directions,
+                     sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                     plane_normals, plane_offsets, cube_mins, cube_maxs, surface_ids,
+                     node_min, node_max, node_child, node_prim_count,
+                     prim_indices, stack_size,
+                     out_t, out_normals, out_surface_ids):
+    """
+    Nearest-hit search for a batch of rays
+
+    Writes the hit distance of ray i to out_t[i] (inf on a miss), its normal
+    to out_normals[i] and the index of the surface hit to out_surface_ids[i]
+    (-1 on a miss). The node_* arrays are the scene BVH, as in
+    trace_primary_tiles. Rays are independent, so they are split across
+    threads.
+    """
+    use_bvh = node_prim_count.shape[0] > 0
+    for i in prange(origins.shape[0]):
+        if use_bvh:
+            t, column, nx, ny, nz = nearest_hit_bvh(
+                origins[i, 0], origins[i, 1], origins[i, 2],
+                directions[i, 0], directions[i, 1], directions[i, 2],
+                sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                plane_normals, plane_offsets, cube_mins, cube_maxs,
+                node_min, node_max, node_child, node_prim_count,
+                prim_indices, stack_size,
+            )
+        else:
+            t, column, nx, ny, nz = nearest_hit(
+                origins[i, 0], origins[i, 1], origins[i, 2],
+                directions[i, 0], directions[i, 1], directions[i, 2],
+                sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                plane_normals, plane_offsets, cube_mins, cube_maxs,
+            )
+        out_t[i] = t
+        out_normals[i, 0] = nx
+        out_normals[i, 1] = ny
+        out_normals[i, 2] = nz
+        out_surface_ids[i] = surface_ids[column] if column >= 0 else -1
+
+
+@njit(fastmath=FASTMATH, cache=True)
+def any_hit_rays(origins, directions, t_max,
+                 sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                 plane_normals, plane_offsets, cube_mins, cube_maxs, surface_ids,
+                 node_min, node_max, node_child, node_prim_count,
+                 prim_indices, stack_size,
+                 out_surface_ids):
+    """
+    Any-hit search for a batch of rays
+
+    Writes to out_surface_ids[i] the index of some surface that ray i hits
+    closer than t_max[i], or -1 if there is none. The node_* arrays are the
+    scene BVH, as in trace_primary_tiles. Shadow batches are a few dozen
+    rays, too few to pay for a parallel launch, so this loop stays serial.
+    """
+    use_bvh = node_prim_count.shape[0] > 0
+    for i in range(origins.shape[0]):
+        if use_bvh:
+            t, column, nx, ny, nz = nearest_hit_bvh(
+                origins[i, 0], origins[i, 1], origins[i, 2],
+                directions[i, 0], directions[i, 1], directions[i, 2],
+                sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                plane_normals, plane_offsets, cube_mins, cube_maxs,
+                node_min, node_max, node_child, node_prim_count,
+                prim_indices, stack_size, -1, t_max[i], True,
+            )
+        else:
+            t, column, nx, ny, nz = nearest_hit(
+                origins[i, 0], origins[i, 1], origins[i, 2],
+                directions[i, 0], directions[i, 1], directions[i, 2],
+                sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                plane_normals, plane_offsets, cube_mins, cube_maxs, -1, t_max[i], True,
+            )
+        out_surface_ids[i] = surface_ids[column] if column >= 0 else -1
+
+
+@njit(fastmath=FASTMATH, cache=True)
+def _scene_hit(ox, oy, oz, dx, dy, dz,
+               sphere_centers, sphere_radii_sq, sphere_inv_radii,
+               plane_normals, plane_offsets, cube_mins, cube_maxs,
+               node_min, node_max, node_child, node_prim_count,
+               prim_indices, stack_size, t_max, any_hit):
+    """nearest_hit of one ray, through the scene BVH if it has one"""
+    if node_prim_count.shape[0] > 0:
+        return nearest_hit_bvh(
+            ox, oy, oz, dx, dy, dz,
+            sphere_centers, sphere_radii_sq, sphere_inv_radii,
+            plane_normals, plane_offsets, cube_mins, cube_maxs,
+            node_min, node_max, node_child, node_prim_count,
+            prim_indices, stack_size, -1, t_max, any_hit,
+        )
+    return nearest_hit(
+        ox, oy, oz, dx, dy, dz,
+        sphere_centers, sphere_radii_sq, sphere_inv_radii,
+        plane_normals, plane_offsets, cube_mins, cube_maxs, -1, t_max, any_hit,
+    )
+
+
+@njit(parallel=True, fastmath=FASTMATH, cache=True)
+def shadow_visibility(hit_points, light_position, light_radius, grid_size, samples,
+                      sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                      plane_normals, plane_offsets, cube_mins, cube_maxs, column_transp,
+                      node_min, node_max, node_child, node_prim_count,
+                      prim_indices, stack_size,
+                      out_visibility):
+    """
+    Fraction of a square area light that each hit point sees
+
+    Hit point i sends grid_size**2 shadow rays, ray k toward a point of cell
+    (k // grid_size, k % grid_size) of the light, placed by samples[i, k]
+    (uniform in [0, 1)^2). A ray that reaches the light counts 1; one that
+    passes through transparent surfaces counts the product of their
+    transparencies (column_transp, per scene column); any opaque blocker
+    makes it 0. The mean over the rays goes to out_visibility[i].
+    """
+    sample_count = grid_size * grid_size
+    cell_size = light_radius / grid_size
+    half_size = light_radius / 2
+    lpx, lpy, lpz = light_position[0], light_position[1], light_position[2]
+
+    for i in prange(hit_points.shape[0]):
+        hx, hy, hz = hit_points[i, 0], hit_points[i, 1], hit_points[i, 2]
+
+        # Basis (right, up) of the light's square, facing the hit point
+        lx, ly, lz = lpx - hx, lpy - hy, lpz - hz
+        inv_length = 1.0 / math.sqrt(lx * lx + ly * ly + lz * lz)
+        lx, ly, lz = lx * inv_length, ly * inv_length, lz * inv_length
+        if abs(lx) > 0.1:
+            rx, ry, rz = -lz, 0.0, lx  # light direction x (0, 1, 0)
+        else:
+            rx, ry, rz = 0.0, lz, -ly  # light direction x (1, 0, 0)
+        inv_length = 1.0 / math.sqrt(rx * rx + ry * ry + rz * rz)
+        rx, ry, rz = rx * inv_length, ry * inv_length, rz * inv_length
+        ux, uy, uz = ly * rz - lz * ry, lz * rx - lx * rz, lx * ry - ly * rx
+        inv_length = 1.0 / math.sqrt(ux * ux + uy * uy + uz * uz)
+        ux, uy, uz = ux * inv_length, uy * inv_length, uz * inv_length
+
+        visible = 0.0
+        for k in range(sample_count):
+            u = ((k // grid_size) + samples[i, k, 0]) * cell_size - half_size
+            v = ((k % grid_size) + samples[i, k, 1]) * cell_size - half_size
+            dx = lpx + u * rx + v * ux - hx
+            dy = lpy + u * ry + v * uy - hy
+            dz = lpz + u * rz + v * uz - hz
+            distance = math.sqrt(dx * dx + dy * dy + dz * dz)
+            dx, dy, dz = dx / distance, dy / distance, dz / distance
+            # Offset to avoid self-intersection
+            ox, oy, oz = hx + dx * 0.001, hy + dy * 0.001, hz + dz * 0.001
+
+            # Any hit decides the common cases: nothing in the way, or an
+            # opaque blocker. Only transparent blockers need the ordered walk.
+            t, column, nx, ny, nz = _scene_hit(
+                ox, oy, oz, dx, dy, dz,
+                sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                plane_normals, plane_offsets, cube_mins, cube_maxs,
+                node_min, node_max, node_child, node_prim_count,
+                prim_indices, stack_size, distance, True,
+            )
+            if column < 0:
+                visible += 1.0
+                continue
+            if column_transp[column] <= 0:
+                continue
+
+            transmitted = 1.0
+            remaining = distance
+            while remaining > 0.001:
+                t, column, nx, ny, nz = _scene_hit(
+                    ox, oy, oz, dx, dy, dz,
+                    sphere_centers, sphere_radii_sq, sphere_inv_radii,
+                    plane_normals, plane_offsets, cube_mins, cube_maxs,
+                    node_min, node_max, node_child, node_prim_count,
+                    prim_indices, stack_size, remaining, False,
+                )
+                if column < 0:
+                    break
+                transmitted *= column_transp[column]
+                if transmitted == 0:
+                    break
+                ox = ox + t * dx + dx * 0.001
+                oy = oy + t * dy + dy * 0.001
+                oz = oz + t * dz + dz * 0.001
+                remaining -= t + 0.001
+            visible += transmitted
+
+        out_visibility[i] = visible / sample_count
+
+
+def trace_primary(camera, scene, image_width, image_height, tile_size=TILE_SIZE):
+    """
+    Primary hits for the whole image with the compiled tile kernel
+
+    Args:
+        camera: Camera object
+        scene: SceneSOA with the scene surfaces
+        image_width: int - Total width of image in pixels
+        image_height: int - Total height of image in pixels
+        tile_size: int - Edge length of the square pixel tiles
+
+    Returns:
+        Tuple (directions, hits): (H*W, 3) unit ray directions and the
+        (H*W,) HIT_DTYPE hit records, one row per pixel in row-major order
+    """
+    pixel_count = image_width * image_height
+    directions = np.empty((pixel_count, 3), dtype=REAL)
+    hits = np.zeros(pixel_count, dtype=HIT_DTYPE)
+
+    screen_height = camera.screen_width * image_height / image_width
+    screen_center = camera.position + camera.forward * camera.screen_distance
+    trace_primary_tiles(
+        image_width, image_height, tile_size,
+        camera.position, screen_center, camera.right, camera.up,
+        float(camera.screen_width), float(screen_height),
+        scene.sphere_centers, scene.sphere_radii_sq, scene.sphere_inv_radii,
+        scene.plane_normals, scene.plane_offsets, scene.cube_mins, scene.cube_maxs, scene.surface_ids,
+        *scene.bvh_arrays,
+        directions, hits,
+    )
+    return directions, hits
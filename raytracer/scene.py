@@ -0,0 +1,296 @@
+import numpy as np
+from surfaces import SURFACE_KIND_SPHERE, SURFACE_KIND_PLANE, SURFACE_KIND_CUBE
+from device import array_module, device_module
+from mathutils import REAL, aligned
+from bvh import BVH
+from jit import NUMBA_AVAILABLE
+from specialize import SPECIALIZE_MAX_SURFACES, scene_kernel_path, load_scene_kernels
+
+# Minimum hit distance, same threshold the surfaces use to avoid self-intersection
+EPSILON = 0.0001
+
+# Below this many spheres and cubes a linear scan beats walking a BVH
+BVH_MIN_SURFACES = 128
+
+
+def intersect_spheres_batch(origins, directions, centers, radii_sq):
+    """
+    Intersect a batch of rays with a batch of spheres
+
+    Args:
+        origins: numpy array (R, 3) - Ray origins, or (3,) for one origin shared by all rays
+        directions: numpy array (R, 3) - Ray directions (normalized)
+        centers: numpy array (S, 3) - Sphere centers
+        radii_sq: numpy array (S,) - Squared sphere radii
+
+    Returns:
+        numpy array (R, S) - Hit distances, np.inf where the ray misses
+    """
+    xp = array_module(origins, centers)
+    if origins.ndim == 1:
+        # Shared origin: oc and c depend on the sphere only, no (R, S, 3) temporary
+        oc = origins - centers
+        b = directions @ oc.T
+        c = xp.einsum('si,si->s', oc, oc) - radii_sq
+    else:
+        oc = origins[:, None, :] - centers[None, :, :]
+        b = xp.einsum('rsi,ri->rs', oc, directions)
+        c = xp.einsum('rsi,rsi->rs', oc, oc) - radii_sq
+    discriminant = b * b - c
+    sqrt_discriminant = xp.sqrt(xp.maximum(discriminant, 0))
+
+    # Nearest root in front of the origin, far root if the origin is inside
+    t = -b - sqrt_discriminant
+    t = xp.where(t > EPSILON, t, -b + sqrt_discriminant)
+    return xp.where((discriminant >= 0) & (t > EPSILON), t, xp.inf)
+
+
+def intersect_planes_batch(origins, directions, normals, offsets):
+    """
+    Intersect a batch of rays with a batch of infinite planes
+
+    Args:
+        origins: numpy array (R, 3) - Ray origins, or (3,) for one origin shared by all rays
+        directions: numpy array (R, 3) - Ray directions (normalized)
+        normals: numpy array (P, 3) - Plane normals (normalized)
+        offsets: numpy array (P,) - Plane offsets
+
+    Returns:
+        numpy array (R, P) - Hit distances, np.inf where the ray misses
+    """
+    xp = array_module(origins, normals)
+    denom = directions @ normals.T
+    parallel = xp.abs(denom) < 1e-6
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (offsets - origins @ normals.T) * (1.0 / denom)  # Matches the cube slabs, see plane_hit
+    return xp.where(~parallel & (t >= EPSILON), t, xp.inf)
+
+
+def _cube_slabs(origins, directions, mins, maxs):
+    """
+    Per-axis slab entry/exit distances for a batch of rays and cubes
+
+    Returns:
+        Tuple (t_near, t_far, outside) of arrays with shape (R, C, 3).
+        Axes the ray is parallel to get infinite slabs; outside marks those
+        where the origin lies outside the slab (a guaranteed miss).
+    """
+    xp = array_module(origins, mins)
+    o = origins if origins.ndim == 1 else origins[:, None, :]
+    d = directions[:, None, :]
+    parallel = xp.abs(d) < 1e-6
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # One divide per ray, then multiplies for every cube
+        inv_d = 1.0 / d
+        t1 = (mins - o) * inv_d
+        t2 = (maxs - o) * inv_d
+    t_near = xp.where(parallel, -xp.inf, xp.minimum(t1, t2))
+    t_far = xp.where(parallel, xp.inf, xp.maximum(t1, t2))
+    outside = parallel & ((o < mins) | (o > maxs))
+    return t_near, t_far, outside
+
+
+def intersect_cubes_batch(origins, directions, mins, maxs):
+    """
+    Intersect a batch of rays with a batch of axis-aligned cubes (slabs method)
+
+    Args:
+        origins: numpy array (R, 3) - Ray origins, or (3,) for one origin shared by all rays
+        directions: numpy array (R, 3) - Ray directions (normalized)
+        mins: numpy array (C, 3) - Minimum corner of each cube
+        maxs: numpy array (C, 3) - Maximum corner of each cube
+
+    Returns:
+        numpy array (R, C) - Hit distances, np.inf where the ray misses
+    """
+    xp = array_module(origins, mins)
+    t_near, t_far, outside = _cube_slabs(origins, directions, mins, maxs)
+    t_min = t_near.max(axis=-1)
+    t_max = t_far.min(axis=-1)
+    hit = (t_min <= t_max) & (t_max >= EPSILON) & ~outside.any(axis=-1)
+
+    # Use the exit distance if the entry point is behind the ray origin
+    t = xp.where(t_min < EPSILON, t_max, t_min)
+    return xp.where(hit, t, xp.inf)
+
+
+class SceneSOA:
+    """
+    Structure-of-arrays view of the scene surfaces
+
+    Groups the surfaces by type into contiguous float32 numpy arrays (each
+    starting on a cache line on the CPU) so a whole batch of rays can be
+    intersected against all surfaces of one type with a single broadcast
+    kernel instead of one Python call per surface. Large scenes also get a
+    BVH over the spheres and cubes (see bvh.py) for the per-ray kernels,
+    small ones a kernel specialized to their geometry (see specialize.py).
+    With device='cuda' the arrays are kept on the GPU (via CuPy) and the
+    batch methods run there; the scalar Numba kernels need a 'cpu' scene.
+    """
+
+    def __init__(self, surfaces, device='cpu'):
+        """
+        Build the typed arrays from a list of surfaces
+
+        Args:
+            surfaces: List of surface objects (Sphere, InfinitePlane, Cube)
+            device: str - 'cpu' for numpy arrays, 'cuda' for CuPy arrays
+        """
+        self.device = device
+        self.surfaces = list(surfaces)
+        spheres = [i for i, s in enumerate(self.surfaces) if s.kind == SURFACE_KIND_SPHERE]
+        planes = [i for i, s in enumerate(self.surfaces) if s.kind == SURFACE_KIND_PLANE]
+        cubes = [i for i, s in enumerate(self.surfaces) if s.kind == SURFACE_KIND_CUBE]
+
+        self.sphere_centers = np.array([self.surfaces[i].position for i in spheres], dtype=REAL).reshape(-1, 3)
+        self.sphere_radii_sq = np.array([self.surfaces[i].radius_sq for i in spheres], dtype=REAL)
+        self.sphere_inv_radii = np.array([self.surfaces[i].inv_radius for i in spheres], dtype=REAL)
+
+        self.plane_normals = np.array(
+            [self.surfaces[i].unit_normal for i in planes], dtype=REAL
+        ).reshape(-1, 3)
+        self.plane_offsets = np.array([self.surfaces[i].offset for i in planes], dtype=REAL)
+
+        cube_centers = np.array([self.surfaces[i].position for i in cubes], dtype=REAL).reshape(-1, 3)
+        cube_half_sizes = np.array([self.surfaces[i].scale / 2 for i in cubes], dtype=REAL)[:, None]
+        self.cube_mins = cube_centers - cube_half_sizes
+        self.cube_maxs = cube_centers + cube_half_sizes
+
+        # Column j of the concatenated distance matrix belongs to surfaces[surface_ids[j]],
+        # and surfaces[i] owns column columns[i]; both are keyed by position, not
+        # by object identity, so they stay valid in a scene unpickled by a worker
+        self.surface_ids = np.array(spheres + planes + cubes, dtype=np.int64)
+        self.columns = np.empty(len(self.surfaces), dtype=np.int64)
+        self.columns[self.surface_ids] = np.arange(len(self.surface_ids))
+
+        # Position of each surface inside its own type's arrays
+        self.type_index = np.zeros(len(self.surfaces), dtype=np.int64)
+        for ids in (spheres, planes, cubes):
+            self.type_index[ids] = np.arange(len(ids))
+        self.is_sphere = np.zeros(len(self.surfaces), dtype=bool)
+        self.is_sphere[spheres] = True
+        self.is_plane = np.zeros(len(self.surfaces), dtype=bool)
+        self.is_plane[planes] = True
+        self.is_cube = np.zeros(len(self.surfaces), dtype=bool)
+        self.is_cube[cubes] = True
+
+        # BVH over the bounded surfaces (spheres, then cubes), for the scalar kernels
+        self.bvh = None
+        if device == 'cpu' and len(spheres) + len(cubes) >= BVH_MIN_SURFACES:
+            boxes = [self.surfaces[i].bounds() for i in spheres + cubes]
+            # Pad the boxes so float32 rounding never puts a hit just outside them
+            self.bvh = BVH(
+                np.array([low for low, _ in boxes]) - EPSILON,
+                np.array([high for _, high in boxes]) + EPSILON,
+            )
+        # Node arrays for the kernels; an empty BVH means "scan linearly"
+        empty = BVH(np.empty((0, 3)), np.empty((0, 3)))
+        self.bvh_arrays = (self.bvh if self.bvh is not None else empty).arrays
+
+        if device != 'cpu':
+            xp = device_module(device)
+            for name in ('sphere_centers', 'sphere_radii_sq', 'sphere_inv_radii',
+                         'plane_normals', 'plane_offsets', 'cube_mins', 'cube_maxs',
+                         'surface_ids', 'type_index', 'is_sphere', 'is_plane', 'is_cube'):
+                setattr(self, name, xp.asarray(getattr(self, name)))
+        else:
+            # The per-ray kernels stream these arrays; start each on a cache line
+            for name in ('sphere_centers', 'sphere_radii_sq', 'sphere_inv_radii',
+                         'plane_normals', 'plane_offsets', 'cube_mins', 'cube_maxs'):
+                setattr(self, name, aligned(getattr(self, name)))
+
+        # Column ranges of each surface type in the distance matrix
+        sphere_end = len(spheres)
+        plane_end = sphere_end + len(planes)
+        self.column_slices = (slice(0, sphere_end), slice(sphere_end, plane_end), slice(plane_end, None))
+        # Reusable distance row for one-ray queries (see intersect_batch)
+        self.scratch_distances = np.empty((1, len(self.surfaces)))
+
+        # Source of the scene-specialized kernels; a path rather than the
+        # module itself, so the scene can still be pickled to worker processes.
+        # None (generic kernels) also when the module cannot be written.
+        self.kernel_path = None
+        if NUMBA_AVAILABLE and device == 'cpu' and 0 < len(self.surfaces) <= SPECIALIZE_MAX_SURFACES:
+            self.kernel_path = scene_kernel_path(self)
+
+    @property
+    def kernels(self):
+        """Module of scene-specialized kernels (see specialize.py), or None"""
+        if self.kernel_path is None:
+            return None
+        return load_scene_kernels(self.kernel_path)
+
+    def column_of(self, surface):
+        """Distance matrix column of a surface object, -1 if it is not in the scene"""
+        for index, candidate in enumerate(self.surfaces):
+            if candidate is surface:
+                return int(self.columns[index])
+        return -1
+
+    def intersect_batch(self, origins, directions, out=None):
+        """
+        Distances from every ray to every surface
+
+        Each surface type writes its columns of the result directly, so no
+        per-type arrays are concatenated.
+
+        Args:
+            origins: numpy array (R, 3) - Ray origins, or (3,) for one origin shared by all rays
+            directions: numpy array (R, 3) - Ray directions (normalized)
+            out: Optional array (R, N) to write the distances into, e.g.
+                 scratch_distances for a single ray
+
+        Returns:
+            numpy array (R, N) - Hit distances (np.inf for misses); column j
+            belongs to surfaces[surface_ids[j]]
+        """
+        xp = array_module(origins, self.sphere_centers)
+        if out is None:
+            dtype = xp.result_type(origins, directions, self.sphere_centers)
+            out = xp.empty((len(directions), len(self.surfaces)), dtype=dtype)
+        spheres, planes, cubes = self.column_slices
+        out[:, spheres] = intersect_spheres_batch(origins, directions, self.sphere_centers, self.sphere_radii_sq)
+        out[:, planes] = intersect_planes_batch(origins, directions, self.plane_normals, self.plane_offsets)
+        out[:, cubes] = intersect_cubes_batch(origins, directions, self.cube_mins, self.cube_maxs)
+        return out
+
+    def normals_batch(self, surface_indices, hit_points, directions):
+        """
+        Surface normals at a batch of hit points
+
+        Args:
+            surface_indices: numpy int array (R,) - Index into surfaces of the hit surface
+            hit_points: numpy array (R, 3) - Hit points
+            directions: numpy array (R, 3) - Directions of the rays that produced the hits
+
+        Returns:
+            numpy array (R, 3) - Normals, same conventions as each surface's intersect
+        """
+        xp = array_module(hit_points, self.sphere_centers)
+        normals = xp.zeros((len(surface_indices), 3))
+        kind_index = self.type_index[surface_indices]
+
+        sphere = self.is_sphere[surface_indices]
+        s = kind_index[sphere]
+        normals[sphere] = (hit_points[sphere] - self.sphere_centers[s]) * self.sphere_inv_radii[s, None]
+
+        plane = self.is_plane[surface_indices]
+        normals[plane] = self.plane_normals[kind_index[plane]]
+
+        # Cube normal faces against the ray on the axis the ray entered through,
+        # i.e. the axis with the latest slab entry distance
+        cube = self.is_cube[surface_indices]
+        if bool(cube.any()):
+            c = kind_index[cube]
+            rows = xp.arange(len(c))
+            d = directions[cube]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t1 = (self.cube_mins[c] - hit_points[cube]) / d
+                t2 = (self.cube_maxs[c] - hit_points[cube]) / d
+            t_near = xp.where(xp.abs(d) < 1e-6, -xp.inf, xp.minimum(t1, t2))
+            axis = xp.argmax(t_near, axis=-1)
+            cube_normals = xp.zeros((len(c), 3))
+            cube_normals[rows, axis] = xp.where(d[rows, axis] > 0, -1.0, 1.0)
+            normals[cube] = cube_normals
+
+        return normals
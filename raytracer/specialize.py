@@ -0,0 +1,195 @@
+"""
+Scene-specialized intersection kernels
+
+The scene geometry is fixed for a whole render, so for small scenes the
+nearest-hit loop is generated as source code with every surface unrolled
+and its parameters written in as constants. Numba then compiles a kernel
+with no array loads or loop bookkeeping and with the scene constants
+folded into the math.
+
+The generated module is written to a per-user cache directory
+(KERNEL_DIR: under NUMBA_CACHE_DIR if set, else under XDG_CACHE_HOME or
+~/.cache) under a name derived from a hash of its source, and its
+functions use cache=True, so the compiled kernels are reused across runs
+and worker processes instead of recompiled for every scene load. If the
+module cannot be written, the scene simply uses the generic kernels.
+
+Nothing removes old modules: every distinct scene leaves a small
+scene_<hash>.py (plus Numba's cache files) behind. The directory can be
+deleted at any time; it is rebuilt on demand.
+"""
+
+import hashlib
+import importlib.util
+import os
+import sys
+
+# Larger scenes use the generic kernels: compile time grows with the number
+# of unrolled surfaces, and from BVH_MIN_SURFACES on the BVH wins anyway
+SPECIALIZE_MAX_SURFACES = 64
+
+KERNEL_DIR = os.path.join(
+    os.environ.get('NUMBA_CACHE_DIR')
+    or os.environ.get('XDG_CACHE_HOME')
+    or os.path.join(os.path.expanduser('~'), '.cache'),
+    'raytracer', 'scene_kernels',
+)
+
+# Loaded kernel modules, by source file path
+_modules = {}
+
+_HEADER = '''\
+# Generated by specialize.py for one scene; do not edit
+from jit import njit, prange, FASTMATH
+from intersect_numba import sphere_hit, plane_hit, cube_hit, INF
+
+
+@njit(fastmath=FASTMATH, cache=True)
+def nearest_hit(ox, oy, oz, dx, dy, dz, ignore_column=-1, t_max=INF, any_hit=False):
+    best_t = t_max
+    best_column = -1
+    best_nx, best_ny, best_nz = 0.0, 0.0, 0.0
+    inv_dx = 1.0 / dx if dx != 0 else INF
+    inv_dy = 1.0 / dy if dy != 0 else INF
+    inv_dz = 1.0 / dz if dz != 0 else INF
+'''
+
+_SURFACE = '''
+    if ignore_column != {column}:
+        t, nx, ny, nz = {call}
+        if t < best_t:
+            best_t, best_column = t, {column}
+            best_nx, best_ny, best_nz = nx, ny, nz
+            if any_hit:
+                return best_t, best_column, best_nx, best_ny, best_nz
+'''
+
+_FOOTER = '''
+    if best_column < 0:
+        best_t = INF
+    return best_t, best_column, best_nx, best_ny, best_nz
+
+
+@njit(parallel=True, fastmath=FASTMATH, cache=True)
+def nearest_hit_rays(origins, directions, surface_ids, out_t, out_normals, out_surface_ids):
+    for i in prange(origins.shape[0]):
+        t, column, nx, ny, nz = nearest_hit(
+            origins[i, 0], origins[i, 1], origins[i, 2],
+            directions[i, 0], directions[i, 1], directions[i, 2],
+        )
+        out_t[i] = t
+        out_normals[i, 0] = nx
+        out_normals[i, 1] = ny
+        out_normals[i, 2] = nz
+        out_surface_ids[i] = surface_ids[column] if column >= 0 else -1
+
+
+@njit(fastmath=FASTMATH, cache=True)
+def any_hit_rays(origins, directions, t_max, surface_ids, out_surface_ids):
+    for i in range(origins.shape[0]):
+        t, column, nx, ny, nz = nearest_hit(
+            origins[i, 0], origins[i, 1], origins[i, 2],
+            directions[i, 0], directions[i, 1], directions[i, 2],
+            -1, t_max[i], True,
+        )
+        out_surface_ids[i] = surface_ids[column] if column >= 0 else -1
+'''
+
+
+def _constants(*values):
+    """Source text of a list of float arguments, exact to the last bit"""
+    return ', '.join(repr(float(value)) for value in values)
+
+
+def scene_kernel_source(scene):
+    """
+    Source of the specialized kernel module for a scene
+
+    The module defines nearest_hit(ox, oy, oz, dx, dy, dz, ignore_column,
+    t_max, any_hit), with the same results as intersect_numba.nearest_hit
+    on the scene arrays, and the batch loops nearest_hit_rays and
+    any_hit_rays over it (see render_numba).
+
+    Args:
+        scene: SceneSOA with the scene surfaces ('cpu' device)
+
+    Returns:
+        str - Python source code
+    """
+    parts = [_HEADER]
+    column = 0
+    for center, radius_sq, inv_radius in zip(scene.sphere_centers, scene.sphere_radii_sq, scene.sphere_inv_radii):
+        call = f'sphere_hit(ox, oy, oz, dx, dy, dz, {_constants(*center, radius_sq, inv_radius)}, best_t)'
+        parts.append(_SURFACE.format(column=column, call=call))
+        column += 1
+    for normal, offset in zip(scene.plane_normals, scene.plane_offsets):
+        call = f'plane_hit(ox, oy, oz, dx, dy, dz, {_constants(*normal, offset)}, best_t)'
+        parts.append(_SURFACE.format(column=column, call=call))
+        column += 1
+    for low, high in zip(scene.cube_mins, scene.cube_maxs):
+        call = (
+            'cube_hit(ox, oy, oz, dx, dy, dz, inv_dx, inv_dy, inv_dz, '
+            f'{_constants(*low, *high)}, best_t)'
+        )
+        parts.append(_SURFACE.format(column=column, call=call))
+        column += 1
+    parts.append(_FOOTER)
+    return ''.join(parts)
+
+
+def scene_kernel_path(scene):
+    """
+    Write the specialized kernel module of a scene, unless it already exists
+
+    Args:
+        scene: SceneSOA with the scene surfaces ('cpu' device)
+
+    Returns:
+        str - Path of the module's source file, or None if it cannot be
+        written (e.g. read-only cache directory)
+    """
+    source = scene_kernel_source(scene)
+    digest = hashlib.sha1(source.encode()).hexdigest()[:16]
+    path = os.path.join(KERNEL_DIR, f'scene_{digest}.py')
+    try:
+        if _read(path) != source:
+            os.makedirs(KERNEL_DIR, exist_ok=True)
+            # Write to a temporary name first, so a concurrent reader never sees a partial file
+            temporary_path = f'{path}.{os.getpid()}.tmp'
+            with open(temporary_path, 'w') as f:
+                f.write(source)
+            os.replace(temporary_path, path)
+    except OSError:
+        return None
+    return path
+
+
+def _read(path):
+    """Contents of a text file, or None if it does not exist or is not text"""
+    try:
+        with open(path) as f:
+            return f.read()
+    except (FileNotFoundError, UnicodeDecodeError):
+        return None
+
+
+def load_scene_kernels(path):
+    """
+    Import a module written by scene_kernel_path (once per process)
+
+    Args:
+        path: str - Path of the module's source file
+
+    Returns:
+        The kernel module
+    """
+    module = _modules.get(path)
+    if module is None:
+        name = os.path.splitext(os.path.basename(path))[0]
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        # Numba's cache looks the module up by name when it loads a kernel
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        _modules[path] = module
+    return module
@@ -0,0 +1,5 @@
+# Surface kinds, set as the class attribute `kind` of each surface type, so
+# code that handles every type compares small ints instead of calling isinstance
+SURFACE_KIND_SPHERE = 0
+SURFACE_KIND_PLANE = 1
+SURFACE_KIND_CUBE = 2
@@ -1,63 +1,58 @@
 import numpy as np
 from intersection import Intersection
+from surfaces import SURFACE_KIND_CUBE
+from intersect_numba import cube_hit, INF
+
+
+def _read_only(vector):
+    """Float array of a vector that can be shared between intersections"""
+    array = np.array(vector, dtype=float)
+    array.flags.writeable = False
+    return array
+
+
+# The six face normals, shared by every cube hit, keyed by their components
+FACE_NORMALS = {
+    normal: _read_only(normal) for normal in (
+        (1.0, 0.0, 0.0), (-1.0, 0.0, 0.0),
+        (0.0, 1.0, 0.0), (0.0, -1.0, 0.0),
+        (0.0, 0.0, 1.0), (0.0, 0.0, -1.0),
+    )
+}
 
 
 class Cube:
+    kind = SURFACE_KIND_CUBE
+
     def __init__(self, position, scale, material_index):
         self.position = np.array(position, dtype=float)
         self.scale = scale
         self.material_index = material_index
+        self.material_row = material_index - 1  # material_index is 1-based
+        # Slab bounds as plain floats (min x, y, z, max x, y, z) for the kernel
+        half_size = scale / 2
+        self.slab_bounds = tuple((self.position - half_size).tolist() + (self.position + half_size).tolist())
     
-    def intersect(self, ray):
+    def intersect(self, ray, t_max=np.inf):
         """
         Find intersection of ray with this cube using slabs method
         
         Args:
             ray: Ray object with origin and direction
+            t_max: float - Upper bound on the hit distance; farther hits are ignored
             
         Returns:
-            Intersection object or None if no intersection
+            Intersection object or None if no intersection closer than t_max
         """
+        t, nx, ny, nz = cube_hit(
+            ray.ox, ray.oy, ray.oz, ray.dx, ray.dy, ray.dz, ray.inv_dx, ray.inv_dy, ray.inv_dz,
+            *self.slab_bounds, t_max
+        )
+        if t == INF:
+            return None
 
-        half_size = self.scale / 2
-        min_bound = self.position - half_size
-        max_bound = self.position + half_size
-
-        t_min = -np.inf
-        t_max = np.inf
-        hit_normal = np.array([0.0, 0.0, 0.0], dtype=float)
-
-        for i in range(3):  # For X, Y, Z axes
-            if abs(ray.direction[i]) < 1e-6:
-                # Ray is parallel to slab
-                if ray.origin[i] < min_bound[i] or ray.origin[i] > max_bound[i]:
-                    return None  # No intersection
-            else:
-                t1 = (min_bound[i] - ray.origin[i]) / ray.direction[i]
-                t2 = (max_bound[i] - ray.origin[i]) / ray.direction[i]
-                if t1 > t2:
-                    t1, t2 = t2, t1  # Swap
-
-                if t1 > t_min:
-                    t_min = t1
-                    hit_normal = np.array([0.0, 0.0, 0.0], dtype=float)
-                    hit_normal[i] = -1.0 if ray.direction[i] > 0 else 1.0
-
-                if t2 < t_max:
-                    t_max = t2
-
-                if t_min > t_max:
-                    return None  # No intersection
-                
-        if t_min < 0.0001:
-            if t_max < 0.0001:
-                return None  # Both intersections behind ray
-            else:
-                t_min = t_max  # Use t_max if t_min is behind
-        
-        hit_point = ray.point_at(t_min)
-
-        return Intersection(hit_point=hit_point, normal=hit_normal, distance=t_min)
+        hit_point = ray.point_at(t)
+        return Intersection(hit_point=hit_point, normal=FACE_NORMALS[nx, ny, nz], distance=t)
     
     def get_normal(self, point):
         """
@@ -79,3 +74,13 @@ class Cube:
                 normal = np.array([0.0, 0.0, 0.0], dtype=float)
                 normal[i] = -1.0
                 return normal
+
+    def bounds(self):
+        """
+        Axis-aligned bounding box of the cube (the cube itself)
+
+        Returns:
+            Tuple (min, max) of numpy arrays [x, y, z] - Box corners
+        """
+        half_size = self.scale / 2
+        return self.position - half_size, self.position + half_size
@@ -1,38 +1,44 @@
 import numpy as np
 from intersection import Intersection
+from surfaces import SURFACE_KIND_PLANE
 from mathutils import normalize
+from intersect_numba import plane_hit, INF
 
 
 class InfinitePlane:
+    kind = SURFACE_KIND_PLANE
+
     def __init__(self, normal, offset, material_index):
         self.normal = np.array(normal, dtype=float)
-        self.offset = offset
+        # Keep the plane as unit_normal . P = offset: scaling the normal to unit
+        # length scales the offset along with it
+        norm = np.linalg.norm(self.normal)
+        self.unit_normal = normalize(self.normal)
+        self.unit_normal.flags.writeable = False  # Shared by every hit on the plane
+        self.offset = float(offset) / norm if norm != 0 else float(offset)
+        self.normal_components = tuple(self.unit_normal.tolist())  # Plain floats for the kernel
         self.material_index = material_index
+        self.material_row = material_index - 1  # material_index is 1-based
     
-    def intersect(self, ray):
+    def intersect(self, ray, t_max=np.inf):
         """
         Find intersection of ray with this plane
         
         Args:
             ray: Ray object with origin and direction
+            t_max: float - Upper bound on the hit distance; farther hits are ignored
             
         Returns:
-            Intersection object or None if no intersection
+            Intersection object or None if no intersection closer than t_max
         """
-        epsilon = 1e-6
+        t, nx, ny, nz = plane_hit(
+            ray.ox, ray.oy, ray.oz, ray.dx, ray.dy, ray.dz, *self.normal_components, self.offset, t_max
+        )
+        if t == INF:
+            return None
 
-        normalized_normal = normalize(self.normal)
-        denom = np.dot(ray.direction, normalized_normal)
-        if abs(denom) < epsilon:
-            return None  # Ray is parallel to the plane
-        
-        t = (self.offset - np.dot(ray.origin, normalized_normal)) / denom
-        if t < 0.0001:
-            return None  # Intersection is behind the ray origin
-        
         hit_point = ray.point_at(t)
-        normal = self.get_normal(hit_point)
-        return Intersection(hit_point=hit_point, normal=normal, distance=t)
+        return Intersection(hit_point=hit_point, normal=self.unit_normal, distance=t)
 
     
     def get_normal(self, point):
@@ -47,4 +53,13 @@ class InfinitePlane:
         """
 
         # For infinite planes, the normal is constant everywhere
-        return normalize(self.normal)
+        return self.unit_normal
+
+    def bounds(self):
+        """
+        Axis-aligned bounding box of the plane, infinite in every direction
+
+        Returns:
+            Tuple (min, max) of numpy arrays [x, y, z] - Box corners
+        """
+        return np.full(3, -np.inf), np.full(3, np.inf)
@@ -1,48 +1,41 @@
 import numpy as np
 from intersection import Intersection
+from surfaces import SURFACE_KIND_SPHERE
+from intersect_numba import sphere_hit, INF
 
 
 class Sphere:
+    kind = SURFACE_KIND_SPHERE
+
     def __init__(self, position, radius, material_index):
         self.position = np.array(position, dtype=float)
         self.radius = radius
+        self.radius_sq = radius * radius
+        # A zero-radius sphere is never hit, but must not stop the scene loading
+        self.inv_radius = 1.0 / radius if radius else 0.0
+        self.center = tuple(self.position.tolist())  # Plain floats for the kernel
         self.material_index = material_index
+        self.material_row = material_index - 1  # material_index is 1-based
     
-    def intersect(self, ray):
+    def intersect(self, ray, t_max=np.inf):
         """
         Find intersection of ray with this sphere
         
         Args:
             ray: Ray object with origin and direction
+            t_max: float - Upper bound on the hit distance; farther hits are ignored
             
         Returns:
-            Intersection object or None if no intersection
+            Intersection object or None if no intersection closer than t_max
         """
-        oc = ray.origin - self.position
-
-        a = np.dot(ray.direction, ray.direction)
-        b = 2.0 * np.dot(oc, ray.direction)
-        c = np.dot(oc, oc) - self.radius ** 2
-
-        discriminant = b ** 2 - 4 * a * c
-
-        if discriminant < 0:
+        t, nx, ny, nz = sphere_hit(
+            ray.ox, ray.oy, ray.oz, ray.dx, ray.dy, ray.dz, *self.center, self.radius_sq, self.inv_radius, t_max
+        )
+        if t == INF:
             return None
-        
-        sqrt_discriminant = np.sqrt(discriminant)
-        t1 = (-b - sqrt_discriminant) / (2 * a)
-        t2 = (-b + sqrt_discriminant) / (2 * a)
-        t = None
-        if t1 > 0.0001:
-            t = t1
-        elif t2 > 0.0001:
-            t = t2
-        if t is None:
-            return None
-        
+
         hit_point = ray.point_at(t)
-        normal = self.get_normal(hit_point)
-        return Intersection(hit_point=hit_point, normal=normal, distance=t)
+        return Intersection(hit_point=hit_point, normal=np.array([nx, ny, nz]), distance=t)
     
     
     def get_normal(self, point):
@@ -57,5 +50,14 @@ class Sphere:
         """
 
         # Normal = (point - center) / radius
-        normal = (point - self.position) / self.radius
+        normal = (point - self.position) * self.inv_radius
         return normal
+
+    def bounds(self):
+        """
+        Axis-aligned bounding box of the sphere
+
+        Returns:
+            Tuple (min, max) of numpy arrays [x, y, z] - Box corners
+        """
+        return self.position - self.radius, self.position + self.radius
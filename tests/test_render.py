@@ -0,0 +1,42 @@
+"""
+Rendering regression tests
+
+Run from the project root with: python -m unittest discover tests
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+RAYTRACER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'raytracer')
+
+
+class RenderWithoutNumbaTest(unittest.TestCase):
+    """Render with a worker pool while Numba cannot be imported"""
+
+    def test_render_with_two_workers(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # A numba package that fails to import, found first by this
+            # process and by the spawned workers alike
+            os.makedirs(os.path.join(temp_dir, 'numba'))
+            with open(os.path.join(temp_dir, 'numba', '__init__.py'), 'w') as f:
+                f.write("raise ImportError('numba disabled for this test')\n")
+            output_path = os.path.join(temp_dir, 'out.png')
+
+            result = subprocess.run(
+                [sys.executable, 'ray_tracer.py', 'scenes/simple_cubes_transparency.txt', output_path,
+                 '--width', '16', '--height', '16', '--workers', '2'],
+                cwd=RAYTRACER_DIR,
+                env=dict(os.environ, PYTHONPATH=temp_dir),
+                capture_output=True,
+                text=True,
+            )
+
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertTrue(os.path.exists(output_path))
+
+
+if __name__ == '__main__':
+    unittest.main()